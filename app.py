@@ -215,8 +215,20 @@ class PoliceAnalyticsApp:
             # Use the first data source for now
             primary_source = data_sources[0]
             
-            # Download and preview data
-            df, metadata = self.data_fetcher.download_and_preview_data(primary_source)
+            progress_bar = st.progress(0.0, text="📥 Connecting...")
+            progress = {}
+            
+            def record_progress(url: str, bytes_read: int, bytes_total: Optional[int]):
+                # Runs in the download thread - only record, the UI is updated below
+                progress.update(bytes_read=bytes_read, bytes_total=bytes_total)
+            
+            # Download and preview data in the background while the progress bar updates
+            future = self.data_fetcher.download_and_preview_data_async(primary_source, progress_callback=record_progress)
+            while not future.done():
+                self.render_download_progress(progress_bar, progress)
+                time.sleep(0.2)
+            df, metadata = future.result()
+            progress_bar.empty()
             
             if df is None:
                 st.error(f"❌ Failed to download data: {metadata.get('error', 'Unknown error')}")
@@ -271,6 +283,19 @@ class PoliceAnalyticsApp:
         
         return True
     
+    def render_download_progress(self, progress_bar, progress: dict):
+        """Update the download progress bar from the latest recorded progress."""
+        if 'bytes_read' not in progress:
+            return
+        
+        mb_read = progress['bytes_read'] / 1024 / 1024
+        bytes_total = progress['bytes_total']
+        if bytes_total:
+            progress_bar.progress(min(progress['bytes_read'] / bytes_total, 1.0),
+                                  text=f"📥 Downloading: {mb_read:.1f} of {bytes_total / 1024 / 1024:.1f} MB")
+        else:
+            progress_bar.progress(0.0, text=f"📥 Downloading: {mb_read:.1f} MB")
+    
     def render_dashboard(self):
         """Render the dashboard section."""
         if not st.session_state.data_loaded:
@@ -36,6 +36,12 @@ SUPPORTED_FORMATS = ['.csv', '.xlsx', '.json', '.parquet']
 API_RATE_LIMIT = 100  # requests per minute
 DOWNLOAD_TIMEOUT = 300  # 5 minutes
 
+# Parsed downloads are cached here as parquet and revalidated with ETag/Last-Modified
+DOWNLOAD_CACHE_DIR = os.getenv('DOWNLOAD_CACHE_DIR', '.cache/downloads')
+
+# Last scraped Stanford catalog, reused across server restarts
+CATALOG_CACHE_PATH = os.getenv('CATALOG_CACHE_PATH', '.cache/stanford_catalog.json')
+
 # Security settings
 HIDE_SENSITIVE_DATA = True
 ALLOW_USER_API_KEYS = True  # Allow users to provide their own API keys
@@ -47,6 +53,7 @@ POLICE_DATA_INITIATIVE_URL = "https://www.policedatainitiative.org/datasets/"
 # Cache settings
 CACHE_EXPIRY = 3600  # 1 hour in seconds
 MAX_CACHE_SIZE = 1000  # Maximum number of cached items
+SCHEMA_CACHE_TTL = 86400  # Persisted schema probes (columns, distinct values) - 24 hours
 
 # Performance thresholds
 MAX_DASHBOARD_LOAD_TIME = 45  # seconds
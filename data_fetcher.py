@@ -8,63 +8,448 @@ Only uses official sources:
 
 import requests
 import pandas as pd
+import numpy as np
 import time
 import logging
-from typing import Dict, List, Optional, Tuple
+import functools
+import hashlib
+import os
+import socket
+import threading
+import types
+import csv
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from typing import IO, Callable, Dict, List, Optional, Tuple
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import re
 import zipfile
 import io
 import json
+import tempfile
+from config import DOWNLOAD_CACHE_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional - fall back to the pandas CSV reader
+    pa = None
+    pacsv = None
+    pq = None
+
+# Arrow types for the pandas dtypes used in DEPT_SCHEMAS
+ARROW_TYPES = {
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'float32': pa.float32(),
+} if pa is not None else {}
+
+# Faster DEFLATE decoders with zlib-compatible APIs, tried in order; stdlib zlib otherwise
+try:
+    from isal import isal_zlib as _fast_zlib
+except ImportError:
+    try:
+        from zlib_ng import zlib_ng as _fast_zlib
+    except ImportError:
+        _fast_zlib = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# TCP keepalive on pooled sockets so the Stanford and backup hosts keep their
+# connection (and skip DNS + TLS setup) between downloads
+KEEPALIVE_SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+if hasattr(socket, 'TCP_KEEPIDLE'):  # Linux only
+    KEEPALIVE_SOCKET_OPTIONS.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30))
+
+# Size of each network read when streaming a download
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+
+# Downloads that need random access (ZIP, Excel) are buffered in memory up to this
+# size; larger ones spill to a temp file
+DOWNLOAD_SPOOL_MAX_SIZE = 16 * 1024 * 1024  # 16 MB
+
+# Version of the processed frames in the download cache. Bump it when parsing or column
+# standardization changes, so entries written by older code are refetched
+DOWNLOAD_CACHE_VERSION = 1
+
+# Arrow parses CSV in blocks of this size, spread across CPU cores
+ARROW_CSV_BLOCK_SIZE = 8 << 20  # 8 MB
+
+# Called as progress_callback(url, bytes_read, bytes_total) while a URL downloads;
+# bytes_total is None when the server does not send Content-Length
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+
+# Shared by all fetchers so background downloads don't spawn a pool per instance
+_download_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="data-download")
+
+
+# Alternative working data sources (since Stanford URLs are giving 406 errors)
+ALTERNATIVE_SOURCES = {
+    "seattle": {
+        "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_wa_seattle_2020_04_01.csv.zip",
+        "backup_url": "https://data.seattle.gov/api/views/28ny-9ts8/rows.csv?accessType=DOWNLOAD",
+        "description": "Seattle Police Terry Stops",
+        "source": "Seattle.gov Open Data"
+    },
+    "chicago": {
+        "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_il_chicago_2020_04_01.csv.zip",
+        "backup_url": "https://data.cityofchicago.org/api/views/ijzp-q8t2/rows.csv?accessType=DOWNLOAD",
+        "description": "Chicago Police Department Stops", 
+        "source": "Chicago Data Portal"
+    },
+    "philadelphia": {
+        "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_pa_philadelphia_2020_04_01.csv.zip",
+        "backup_url": "https://www.opendataphilly.org/dataset/police-complaints/resource/934f32d8-d8b6-4ba9-8ce1-5e9b4c8bb1cb",
+        "description": "Philadelphia Police Department Traffic Stops",
+        "source": "Philadelphia Open Data"
+    },
+    "los_angeles": {
+        "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_ca_los_angeles_2020_04_01.csv.zip",
+        "backup_url": "https://data.lacity.org/api/views/2nrs-mtv8/rows.csv?accessType=DOWNLOAD",
+        "description": "LAPD Crime and Arrest Data",
+        "source": "LA Open Data"
+    }
+}
+
+
+# Header rules for _standardize_columns, checked in order against the lower-cased
+# column name with '_' and ' ' removed; the first match wins. A None target claims
+# the column without renaming it (e.g. a 'race' column that isn't the driver's)
+_COLUMN_RULES = [
+    # Date/time mapping
+    (r'(?=.*(?:date|time))(?=.*(?:stop|datetime))', 'stop_date'),
+    (r'(?=.*(?:date|time))', None),
+    # Demographics mapping
+    (r'(?=.*(?:race|ethnicity))(?=.*(?:subject|driver))', 'driver_race'),
+    (r'(?=.*(?:race|ethnicity))', None),
+    (r'(?=.*(?:sex|gender))(?=.*(?:subject|driver))', 'driver_gender'),
+    (r'(?=.*(?:sex|gender))', None),
+    (r'(?=.*age)(?=.*(?:subject|driver))', 'driver_age'),
+    (r'(?=.*age)', None),
+    # Search and outcome mapping
+    (r'(?=.*search)(?=.*(?:conducted|performed))', 'search_conducted'),
+    (r'(?=.*contraband)(?=.*found)', 'contraband_found'),
+    (r'(?=.*arrest)(?=.*(?:made|performed))', 'arrest_made'),
+    (r'(?=.*citation)(?=.*issued)', 'citation_issued'),
+    (r'(?=.*warning)(?=.*issued)', 'warning_issued'),
+    (r'(?=.*(?:outcome|disposition))', 'stop_outcome'),
+    # Location mapping - use 'longitude' instead of 'lng' for Streamlit
+    (r'(?=.*lat)(?!.*(?:lon|lng))', 'lat'),
+    (r'(?=.*(?:lon|lng))', 'longitude'),
+    (r'(?=.*(?:district|precinct))', 'district'),
+]
+
+# All rules in one pattern; each alternative is a named group r<index>, so
+# match.lastgroup identifies the rule that fired
+_COLUMN_RULES_RE = re.compile(
+    '|'.join(f'(?P<r{i}>{pattern})' for i, (pattern, _) in enumerate(_COLUMN_RULES)),
+    re.DOTALL
+)
+
+# Plain integer/decimal strings, as written in CSV exports
+_NUMERIC_RE = re.compile(r'^\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*$')
+
+
+def _install_fast_inflate() -> None:
+    """Point zipfile's DEFLATE decompression at the accelerated backend, if one is installed.
+    
+    zipfile creates its decompressors through the module-level name `zipfile.zlib`, so a
+    copy of stdlib zlib with only decompressobj swapped out is enough; CRC checks and
+    compression keep using the stdlib implementation.
+    """
+    if _fast_zlib is None:
+        return
+    shim = types.ModuleType('zlib')
+    shim.__dict__.update(vars(zlib))
+    shim.decompressobj = _fast_zlib.decompressobj
+    zipfile.zlib = shim
+    logger.info(f"Using {_fast_zlib.__name__} for ZIP decompression")
+
+
+_install_fast_inflate()
+
+
+def _open_zip(file_obj: IO[bytes]) -> zipfile.ZipFile:
+    """Open a downloaded archive; DEFLATE members decode through the fast backend above."""
+    return zipfile.ZipFile(file_obj)
+
+
+def _content_length(response: requests.Response) -> Optional[int]:
+    """Return the response's Content-Length, or None when it is missing or malformed."""
+    content_length = response.headers.get('Content-Length')
+    return int(content_length) if content_length and content_length.isdigit() else None
+
+
+class _ProgressReader(io.RawIOBase):
+    """Read-only raw stream over a urllib3 response that reports progress as it is read.
+    
+    Progress is the number of bytes received on the wire (raw.tell()), so it lines up
+    with Content-Length even when the body is gzip-encoded.
+    """
+    
+    def __init__(self, raw, url: str, progress_callback: Optional[ProgressCallback],
+                 bytes_total: Optional[int]):
+        self._raw = raw
+        self._url = url
+        self._progress_callback = progress_callback
+        self._bytes_total = bytes_total
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, b) -> int:
+        data = self._raw.read(len(b))
+        n = len(data)
+        b[:n] = data
+        if n and self._progress_callback:
+            self._progress_callback(self._url, self._raw.tell(), self._bytes_total)
+        return n
+
+
+# Column types of the Stanford Open Policing files, which share one standardized
+# schema. Only columns whose inferred type is wasteful are listed (low-cardinality
+# strings and float64 coordinates/ages); anything absent from a file is ignored
+STANFORD_DTYPES = {
+    'subject_race': 'category',
+    'subject_sex': 'category',
+    'subject_age': 'float32',  # float so missing ages survive as NaN
+    'type': 'category',
+    'outcome': 'category',
+    'reason_for_stop': 'category',
+    'violation': 'category',
+    'district': 'category',
+    'precinct': 'category',
+    'beat': 'category',
+    'lat': 'float32',
+    'lng': 'float32',
+}
+
+# Known column types per dataset_key in ALTERNATIVE_SOURCES
+DEPT_SCHEMAS = {
+    "seattle": STANFORD_DTYPES,
+    "chicago": STANFORD_DTYPES,
+    "philadelphia": STANFORD_DTYPES,
+    "los_angeles": STANFORD_DTYPES,
+}
+
+
+# Float columns stored as float32 regardless of whether the downcast is exact
+FLOAT32_COLUMNS = {'lat', 'lng', 'longitude'}
+
+_UNSIGNED_INT_DTYPES = [np.dtype(t) for t in (np.uint8, np.uint16, np.uint32, np.uint64)]
+_SIGNED_INT_DTYPES = [np.dtype(t) for t in (np.int8, np.int16, np.int32, np.int64)]
+
+
+def _choose_int_dtype(lo, hi) -> np.dtype:
+    """Return the smallest integer dtype covering [lo, hi], unsigned when lo >= 0."""
+    candidates = _UNSIGNED_INT_DTYPES if lo >= 0 else _SIGNED_INT_DTYPES
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return candidates[-1]
+
+
+class _RangeNotSupported(Exception):
+    """The server answered a Range request with something other than 206 Partial Content."""
+
+
+class _HTTPRangeReader(io.RawIOBase):
+    """Seekable, read-only view of a remote file backed by HTTP Range requests.
+    
+    Sequential reads continue a single open-ended ranged response; reading after a
+    seek elsewhere opens a new range at that position. This keeps the request count
+    to a handful for zipfile (end-of-archive records, central directory, one member).
+    """
+    
+    def __init__(self, session: requests.Session, url: str, size: int,
+                 progress_callback: Optional[ProgressCallback] = None):
+        self._session = session
+        self._url = url
+        self._size = size
+        self._progress_callback = progress_callback
+        self._pos = 0
+        self._response = None
+        self._response_pos = None
+        self.bytes_fetched = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._pos
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+        self._pos = pos
+        return pos
+    
+    def readinto(self, b) -> int:
+        if self._pos >= self._size:
+            return 0
+        if self._response is None or self._response_pos != self._pos:
+            self._open_range()
+        
+        data = self._response.raw.read(len(b))
+        if not data:
+            raise _RangeNotSupported(f"Range response ended early at byte {self._pos}")
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        self._response_pos = self._pos
+        self.bytes_fetched += n
+        if self._progress_callback:
+            self._progress_callback(self._url, self.bytes_fetched, self._size)
+        return n
+    
+    def close(self) -> None:
+        self._close_response()
+        super().close()
+    
+    def _open_range(self) -> None:
+        self._close_response()
+        # identity encoding so the byte offsets refer to the file itself
+        response = self._session.get(self._url, stream=True, timeout=120,
+                                     headers={'Range': f'bytes={self._pos}-',
+                                              'Accept-Encoding': 'identity'})
+        if response.status_code != 206:
+            response.close()
+            raise _RangeNotSupported(f"HTTP {response.status_code} for range starting at {self._pos}")
+        self._response = response
+        self._response_pos = self._pos
+    
+    def _close_response(self) -> None:
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections enable TCP keepalive."""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _shared_session() -> requests.Session:
+    """Return the process-wide download session, creating it on first use.
+    
+    Streamlit builds a new RealDataFetcher on every rerun; sharing the session keeps
+    the pooled keep-alive connections (and their TLS state) alive between them.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Pool connections per host and retry transient server errors. 403/406
+            # are not retried - download_and_preview_data moves on to the backup URL
+            adapter = KeepAliveAdapter(
+                pool_connections=8,
+                pool_maxsize=32,
+                max_retries=Retry(total=3, backoff_factor=0.3,
+                                  status_forcelist=[429, 500, 502, 503, 504],
+                                  raise_on_status=False)
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            # Improved headers to avoid 406 errors
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1'
+            })
+            _session = session
+        return _session
+
+
+@functools.lru_cache(maxsize=None)
+def _find_sources_cached(department_lower: str) -> Tuple[Tuple[Tuple[str, str], ...], ...]:
+    """Match a lower-cased department name against the known datasets.
+    
+    The source table is static, so results are memoized; each source is returned as a
+    tuple of items to keep the cached value immutable.
+    """
+    data_sources = []
+    
+    # Search Stanford datasets
+    if "seattle" in department_lower:
+        data_sources.append({
+            "source": "Stanford Open Policing Project",
+            "format": "CSV (ZIP compressed)",
+            "last_updated": "2020-04-01", 
+            "description": "Seattle Police Department traffic stops (319,959 records, 2006-2015)",
+            "url": ALTERNATIVE_SOURCES["seattle"]["primary_url"],
+            "dataset_key": "seattle"
+        })
+    elif "philadelphia" in department_lower or "philly" in department_lower:
+        data_sources.append({
+            "source": "Stanford Open Policing Project",
+            "format": "CSV (ZIP compressed)",
+            "last_updated": "2020-04-01",
+            "description": "Philadelphia Police Department traffic stops",
+            "url": ALTERNATIVE_SOURCES["philadelphia"]["primary_url"],
+            "dataset_key": "philadelphia"
+        })
+    elif "chicago" in department_lower:
+        data_sources.append({
+            "source": "Stanford Open Policing Project", 
+            "format": "CSV (ZIP compressed)",
+            "last_updated": "2020-04-01",
+            "description": "Chicago Police Department traffic stops",
+            "url": ALTERNATIVE_SOURCES["chicago"]["primary_url"],
+            "dataset_key": "chicago"
+        })
+    elif "los angeles" in department_lower or "lapd" in department_lower:
+        data_sources.append({
+            "source": "Stanford Open Policing Project",
+            "format": "CSV (ZIP compressed)", 
+            "last_updated": "2020-04-01",
+            "description": "Los Angeles Police Department traffic stops",
+            "url": ALTERNATIVE_SOURCES["los_angeles"]["primary_url"],
+            "dataset_key": "los_angeles"
+        })
+    
+    return tuple(tuple(source.items()) for source in data_sources)
+
+
 class RealDataFetcher:
     def __init__(self):
-        self.session = requests.Session()
-        # Improved headers to avoid 406 errors
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        })
+        # One pooled session for all fetchers, so repeat downloads reuse open connections
+        self.session = _shared_session()
         
         # Official data sources - THESE ARE THE ONLY SOURCES ALLOWED
         self.stanford_url = "https://openpolicing.stanford.edu/data/"
         self.pdi_url = "https://www.policedatainitiative.org/datasets/"
         
         # Alternative working data sources (since Stanford URLs are giving 406 errors)
-        self.alternative_sources = {
-            "seattle": {
-                "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_wa_seattle_2020_04_01.csv.zip",
-                "backup_url": "https://data.seattle.gov/api/views/28ny-9ts8/rows.csv?accessType=DOWNLOAD",
-                "description": "Seattle Police Terry Stops",
-                "source": "Seattle.gov Open Data"
-            },
-            "chicago": {
-                "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_il_chicago_2020_04_01.csv.zip",
-                "backup_url": "https://data.cityofchicago.org/api/views/ijzp-q8t2/rows.csv?accessType=DOWNLOAD",
-                "description": "Chicago Police Department Stops", 
-                "source": "Chicago Data Portal"
-            },
-            "philadelphia": {
-                "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_pa_philadelphia_2020_04_01.csv.zip",
-                "backup_url": "https://www.opendataphilly.org/dataset/police-complaints/resource/934f32d8-d8b6-4ba9-8ce1-5e9b4c8bb1cb",
-                "description": "Philadelphia Police Department Traffic Stops",
-                "source": "Philadelphia Open Data"
-            },
-            "los_angeles": {
-                "primary_url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_ca_los_angeles_2020_04_01.csv.zip",
-                "backup_url": "https://data.lacity.org/api/views/2nrs-mtv8/rows.csv?accessType=DOWNLOAD",
-                "description": "LAPD Crime and Arrest Data",
-                "source": "LA Open Data"
-            }
-        }
+        self.alternative_sources = ALTERNATIVE_SOURCES
+        
+        self._pool = _download_pool
         
     def get_available_departments(self) -> List[str]:
         """Get list of departments with available real data."""
@@ -80,46 +465,8 @@ class RealDataFetcher:
         logger.info(f"Searching Stanford data for: {department}")
         logger.info(f"Searching Police Data Initiative for: {department}")
         
-        data_sources = []
-        department_lower = department.lower()
-        
-        # Search Stanford datasets
-        if "seattle" in department_lower:
-            data_sources.append({
-                "source": "Stanford Open Policing Project",
-                "format": "CSV (ZIP compressed)",
-                "last_updated": "2020-04-01", 
-                "description": "Seattle Police Department traffic stops (319,959 records, 2006-2015)",
-                "url": self.alternative_sources["seattle"]["primary_url"],
-                "dataset_key": "seattle"
-            })
-        elif "philadelphia" in department_lower or "philly" in department_lower:
-            data_sources.append({
-                "source": "Stanford Open Policing Project",
-                "format": "CSV (ZIP compressed)",
-                "last_updated": "2020-04-01",
-                "description": "Philadelphia Police Department traffic stops",
-                "url": self.alternative_sources["philadelphia"]["primary_url"],
-                "dataset_key": "philadelphia"
-            })
-        elif "chicago" in department_lower:
-            data_sources.append({
-                "source": "Stanford Open Policing Project", 
-                "format": "CSV (ZIP compressed)",
-                "last_updated": "2020-04-01",
-                "description": "Chicago Police Department traffic stops",
-                "url": self.alternative_sources["chicago"]["primary_url"],
-                "dataset_key": "chicago"
-            })
-        elif "los angeles" in department_lower or "lapd" in department_lower:
-            data_sources.append({
-                "source": "Stanford Open Policing Project",
-                "format": "CSV (ZIP compressed)", 
-                "last_updated": "2020-04-01",
-                "description": "Los Angeles Police Department traffic stops",
-                "url": self.alternative_sources["los_angeles"]["primary_url"],
-                "dataset_key": "los_angeles"
-            })
+        # Rebuild plain dicts from the memoized (immutable) entries
+        data_sources = [dict(source) for source in _find_sources_cached(department.lower())]
         
         # If no exact match found, return empty list - NO SAMPLE DATA FALLBACK
         if not data_sources:
@@ -127,8 +474,12 @@ class RealDataFetcher:
             
         return data_sources
     
-    def download_and_preview_data(self, data_source: Dict) -> Tuple[Optional[pd.DataFrame], Dict]:
-        """Download REAL data from official source - NO SAMPLE GENERATION."""
+    def download_and_preview_data(self, data_source: Dict,
+                                  progress_callback: Optional[ProgressCallback] = None) -> Tuple[Optional[pd.DataFrame], Dict]:
+        """Download REAL data from official source - NO SAMPLE GENERATION.
+        
+        progress_callback, if given, is called after every downloaded chunk of each URL tried.
+        """
         url = data_source['url']
         dataset_key = data_source.get('dataset_key', 'unknown')
         
@@ -141,6 +492,8 @@ class RealDataFetcher:
         if dataset_key in self.alternative_sources:
             backup_url = self.alternative_sources[dataset_key]["backup_url"]
             urls_to_try.append(backup_url)
+            # Start with a backup only if the primary doesn't answer its probe
+            urls_to_try = self._order_by_probe(urls_to_try)
         
         last_error = None
         
@@ -149,36 +502,53 @@ class RealDataFetcher:
                 logger.info(f"Attempting to download from: {attempt_url}")
                 start_time = time.time()
                 
-                # Download the data with improved error handling
-                response = self.session.get(attempt_url, timeout=120, stream=True, allow_redirects=True)
+                # Revalidate against the on-disk copy of this URL, if there is one
+                cache_entry = self._load_cache_entry(attempt_url)
+                headers = {}
+                if cache_entry:
+                    if cache_entry.get('etag'):
+                        headers['If-None-Match'] = cache_entry['etag']
+                    if cache_entry.get('last_modified'):
+                        headers['If-Modified-Since'] = cache_entry['last_modified']
                 
-                # Check for specific error codes
-                if response.status_code == 406:
-                    logger.warning(f"406 Not Acceptable error for {attempt_url}, trying next URL...")
-                    continue
-                elif response.status_code == 403:
-                    logger.warning(f"403 Forbidden error for {attempt_url}, trying next URL...")
-                    continue
+                # Known column types only apply to the Stanford files, not the backups
+                dtypes = DEPT_SCHEMAS.get(dataset_key) if attempt_url == url else None
                 
-                response.raise_for_status()
+                df = None
+                if not cache_entry and (attempt_url.endswith('.zip') or 'zip' in attempt_url):
+                    # Fetch just the CSV member with Range requests when the server allows it
+                    df = self._read_zip_ranged(attempt_url, progress_callback, dtypes)
                 
-                # Handle different file types with chunked processing
-                if attempt_url.endswith('.zip') or 'zip' in attempt_url:
-                    # Handle ZIP files (Stanford format)
-                    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-                        csv_files = [f for f in z.namelist() if f.endswith('.csv')]
-                        if not csv_files:
-                            raise ValueError("No CSV file found in ZIP archive")
+                if df is None:
+                    # Download the data with improved error handling. The with block closes the
+                    # response on every path so its connection goes back to the shared pool
+                    with self.session.get(attempt_url, headers=headers, timeout=120, stream=True,
+                                          allow_redirects=True) as response:
+                        # Check for specific error codes
+                        if response.status_code == 406:
+                            logger.warning(f"406 Not Acceptable error for {attempt_url}, trying next URL...")
+                            continue
+                        elif response.status_code == 403:
+                            logger.warning(f"403 Forbidden error for {attempt_url}, trying next URL...")
+                            continue
                         
-                        with z.open(csv_files[0]) as csv_file:
-                            # Use chunked processing for memory efficiency
-                            df = self.process_data_in_chunks(csv_file, 'csv')
-                elif attempt_url.endswith('.xlsx') or attempt_url.endswith('.xls'):
-                    # Handle Excel files with optimization
-                    df = self.process_data_in_chunks(io.BytesIO(response.content), 'excel')
-                else:
-                    # Handle direct CSV with chunked processing
-                    df = self.process_data_in_chunks(io.StringIO(response.text), 'csv')
+                        if response.status_code == 304 and cache_entry:
+                            logger.info(f"{attempt_url} not modified, loading cached copy")
+                            try:
+                                df = self._read_cached_frame(attempt_url)
+                            except Exception as e:
+                                # Drop the entry, or every later request would get a 304 for it too
+                                logger.warning(f"Cached copy of {attempt_url} is unreadable, downloading again: {e}")
+                                self._drop_cache_entry(attempt_url)
+                                with self.session.get(attempt_url, timeout=120, stream=True,
+                                                      allow_redirects=True) as full_response:
+                                    full_response.raise_for_status()
+                                    df = self._parse_response(full_response, attempt_url, progress_callback, dtypes)
+                                    self._save_cache_entry(attempt_url, df, full_response.headers)
+                        else:
+                            response.raise_for_status()
+                            df = self._parse_response(response, attempt_url, progress_callback, dtypes)
+                            self._save_cache_entry(attempt_url, df, response.headers)
                 
                 download_time = time.time() - start_time
                 
@@ -211,59 +581,301 @@ class RealDataFetcher:
         logger.error(error_msg)
         return None, {"error": error_msg, "real_data": False}
     
+    def _parse_response(self, response: requests.Response, url: str,
+                        progress_callback: Optional[ProgressCallback] = None,
+                        dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """Read a successful download and parse it according to its file type.
+        
+        dtypes, if given, are known column types passed through to the CSV reader.
+        """
+        if url.endswith('.zip') or 'zip' in url:
+            # Handle ZIP files (Stanford format). The central directory sits at the
+            # end of the archive, so spool it to a temp file (memory only for small
+            # archives) rather than holding the whole download in RAM
+            with self._read_response(response, url, progress_callback) as spool:
+                with _open_zip(spool) as z:
+                    csv_files = [f for f in z.namelist() if f.endswith('.csv')]
+                    if not csv_files:
+                        raise ValueError("No CSV file found in ZIP archive")
+                    
+                    with z.open(csv_files[0]) as csv_file:
+                        # Decompression is streamed into the chunked CSV reader
+                        return self.process_data_in_chunks(csv_file, 'csv', dtypes=dtypes)
+        elif url.endswith('.xlsx') or url.endswith('.xls'):
+            # Handle Excel files with optimization
+            with self._read_response(response, url, progress_callback) as body:
+                return self.process_data_in_chunks(body, 'excel')
+        else:
+            # Handle direct CSV with chunked processing, parsing while the body downloads
+            body = self._stream_response(response, url, progress_callback)
+            return self.process_data_in_chunks(body, 'csv', dtypes=dtypes)
+    
+    def _read_zip_ranged(self, url: str, progress_callback: Optional[ProgressCallback] = None,
+                         dtypes: Optional[Dict[str, str]] = None) -> Optional[pd.DataFrame]:
+        """Parse the CSV inside a remote ZIP, downloading only the bytes zipfile reads.
+        
+        Only the central directory and the CSV member are fetched, via HTTP Range
+        requests. Returns None, so the caller falls back to a full download, when the
+        server doesn't advertise byte ranges or stops honouring them.
+        """
+        try:
+            head = self.session.head(url, timeout=30, allow_redirects=True)
+        except requests.RequestException as e:
+            logger.info(f"HEAD failed for {url}, using a full download: {e}")
+            return None
+        
+        size = _content_length(head)
+        if head.status_code != 200 or head.headers.get('Accept-Ranges', '').lower() != 'bytes' or not size:
+            return None
+        
+        logger.info(f"Reading {url} with range requests ({size / 1024 / 1024:.1f} MB archive)")
+        remote = _HTTPRangeReader(self.session, head.url, size, progress_callback)
+        try:
+            with io.BufferedReader(remote, buffer_size=DOWNLOAD_CHUNK_SIZE) as f, _open_zip(f) as z:
+                csv_files = [name for name in z.namelist() if name.endswith('.csv')]
+                if not csv_files:
+                    raise ValueError("No CSV file found in ZIP archive")
+                
+                with z.open(csv_files[0]) as csv_file:
+                    df = self.process_data_in_chunks(csv_file, 'csv', dtypes=dtypes)
+        except (_RangeNotSupported, zipfile.BadZipFile) as e:
+            logger.info(f"Range reads failed for {url}, using a full download: {e}")
+            return None
+        finally:
+            remote.close()
+        
+        logger.info(f"Fetched {remote.bytes_fetched / 1024 / 1024:.1f} of {size / 1024 / 1024:.1f} MB")
+        self._save_cache_entry(url, df, head.headers)
+        return df
+    
+    def _cache_paths(self, url: str) -> Tuple[str, str]:
+        """Return the (parquet, sidecar JSON) paths used to cache a download."""
+        key = hashlib.sha1(url.encode()).hexdigest()
+        base = os.path.join(DOWNLOAD_CACHE_DIR, key)
+        return f"{base}.parquet", f"{base}.json"
+    
+    def _load_cache_entry(self, url: str) -> Optional[Dict]:
+        """Return the cached validators (etag, last_modified) for url, if a cached copy exists.
+        
+        Entries written with a different DOWNLOAD_CACHE_VERSION are ignored (and replaced by
+        the next download).
+        """
+        if pa is None:
+            return None
+        parquet_path, meta_path = self._cache_paths(url)
+        if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable download cache entry for {url}: {e}")
+            return None
+        if entry.get('version') != DOWNLOAD_CACHE_VERSION:
+            logger.info(f"Ignoring download cache entry for {url} from an older version")
+            return None
+        return entry
+    
+    def _drop_cache_entry(self, url: str) -> None:
+        """Delete the cached copy of url and its sidecar, if present."""
+        for path in self._cache_paths(url):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove download cache file {path}: {e}")
+    
+    def _read_cached_frame(self, url: str) -> pd.DataFrame:
+        """Load the cached parquet copy of url through a memory map.
+        
+        Pages come from the OS page cache (shared between sessions and processes) instead
+        of being read into a private buffer first.
+        """
+        table = pq.read_table(self._cache_paths(url)[0], memory_map=True)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    
+    def _save_cache_entry(self, url: str, df: pd.DataFrame, headers) -> None:
+        """Write the parsed frame as parquet plus a sidecar with the response validators.
+        
+        Responses without an ETag or Last-Modified can't be revalidated, so they aren't cached.
+        Caching is best-effort: any failure is logged and the download result is unaffected.
+        """
+        if pa is None or df is None or df.empty:
+            return
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        
+        parquet_path, meta_path = self._cache_paths(url)
+        try:
+            os.makedirs(DOWNLOAD_CACHE_DIR, exist_ok=True)
+            # Write to temp names and rename, so a crash never leaves a half-written entry
+            df.to_parquet(f"{parquet_path}.tmp", engine='pyarrow', compression='zstd', index=False)
+            with open(f"{meta_path}.tmp", 'w') as f:
+                json.dump({"url": url, "etag": etag, "last_modified": last_modified,
+                           "cached_at": time.time(), "version": DOWNLOAD_CACHE_VERSION}, f)
+            os.replace(f"{parquet_path}.tmp", parquet_path)
+            os.replace(f"{meta_path}.tmp", meta_path)
+            logger.info(f"Cached download of {url} at {parquet_path}")
+        except Exception as e:
+            logger.warning(f"Could not cache download of {url}: {e}")
+    
+    def download_and_preview_data_async(self, data_source: Dict,
+                                        progress_callback: Optional[ProgressCallback] = None) -> Future:
+        """Run download_and_preview_data in a background thread.
+        
+        The returned Future resolves to the same (df, metadata) tuple. progress_callback is
+        invoked from the worker thread, so it must not call Streamlit directly.
+        """
+        return self._pool.submit(self.download_and_preview_data, data_source, progress_callback)
+    
+    def _order_by_probe(self, urls: List[str], timeout: float = 5) -> List[str]:
+        """Probe all URLs with parallel HEAD requests; keep the primary first unless it fails.
+        
+        The backups are different datasets with their own schemas, so urls[0] stays in front
+        whenever its probe answers 200 within timeout. Only if it errors, answers otherwise or
+        times out is the first backup to answer 200 moved ahead of it. The other URLs keep
+        their order (and are still tried on failure).
+        """
+        deadline = time.monotonic() + timeout
+        executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="data-probe")
+        futures = {executor.submit(self.session.head, u, timeout=timeout, allow_redirects=True): u
+                   for u in urls}
+        
+        def answered_ok(future: Future) -> bool:
+            try:
+                return future.result().status_code == 200
+            except requests.RequestException as e:
+                logger.info(f"Probe failed for {futures[future]}: {e}")
+                return False
+        
+        winner = None
+        try:
+            primary = next(iter(futures))
+            wait([primary], timeout=timeout)
+            if primary.done() and answered_ok(primary):
+                return urls
+            logger.info(f"Primary source {urls[0]} did not answer its probe, checking backups")
+            
+            pending = set(futures) - {primary}
+            while pending and winner is None:
+                done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    break  # out of time
+                winner = next((futures[f] for f in done if answered_ok(f)), None)
+        finally:
+            # Don't block on slow probes; their threads finish within the timeout
+            executor.shutdown(wait=False)
+        
+        if winner is None:
+            return urls
+        logger.info(f"{winner} answered while the primary did not, trying it first")
+        return [winner] + [u for u in urls if u != winner]
+    
+    def download_all(self, departments: List[str],
+                     max_workers: int = 4) -> Dict[str, Tuple[Optional[pd.DataFrame], Dict]]:
+        """Download several departments concurrently over the shared session.
+        
+        Returns {department: (df, metadata)} in the same shape as download_and_preview_data;
+        departments without a known source map to (None, error metadata).
+        """
+        results = {}
+        sources = {}
+        for department in departments:
+            data_sources = self.find_department_data(department)
+            if data_sources:
+                sources[department] = data_sources[0]
+            else:
+                results[department] = (None, {"error": f"No REAL data found for {department}", "real_data": False})
+        
+        if not sources:
+            return results
+        
+        # A dedicated pool (capped at one worker per department) so this can run from
+        # inside the shared background pool without waiting on its own workers
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(sources)),
+                                thread_name_prefix="data-download-all") as executor:
+            futures = {
+                executor.submit(self.download_and_preview_data, source): department
+                for department, source in sources.items()
+            }
+            for future in as_completed(futures):
+                department = futures[future]
+                try:
+                    results[department] = future.result()
+                except Exception as e:
+                    logger.error(f"Download failed for {department}: {e}")
+                    results[department] = (None, {"error": str(e), "real_data": False})
+        
+        return results
+    
+    def _read_response(self, response: requests.Response, url: str,
+                       progress_callback: Optional[ProgressCallback] = None) -> IO[bytes]:
+        """Read a streamed response body chunk by chunk, reporting progress after each chunk.
+        
+        The body is spooled to a SpooledTemporaryFile (memory-only up to
+        DOWNLOAD_SPOOL_MAX_SIZE), returned rewound; the caller closes it.
+        """
+        bytes_total = _content_length(response)
+        bytes_read = 0
+        
+        body = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_SIZE)
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            body.write(chunk)
+            bytes_read += len(chunk)
+            if progress_callback:
+                progress_callback(url, bytes_read, bytes_total)
+        
+        body.seek(0)
+        return body
+    
+    def _stream_response(self, response: requests.Response, url: str,
+                         progress_callback: Optional[ProgressCallback] = None) -> IO[bytes]:
+        """Wrap a streamed response as a buffered file object for the CSV readers.
+        
+        The body is read straight off the socket (gzip/deflate transfer encoding decoded),
+        so nothing is held in memory beyond the reader's buffer.
+        """
+        response.raw.decode_content = True
+        raw = _ProgressReader(response.raw, url, progress_callback, _content_length(response))
+        return io.BufferedReader(raw, buffer_size=DOWNLOAD_CHUNK_SIZE)
+    
     def _standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Standardize column names to common schema."""
         # Create column mapping based on common patterns in police data
         column_mapping = {}
         
-        for col in df.columns:
-            col_lower = col.lower().replace('_', '').replace(' ', '')
-            
-            # Date/time mapping
-            if 'date' in col_lower or 'time' in col_lower:
-                if 'stop' in col_lower:
-                    column_mapping[col] = 'stop_date'
-                elif 'datetime' in col_lower:
-                    column_mapping[col] = 'stop_date'
-            
-            # Demographics mapping
-            elif 'race' in col_lower or 'ethnicity' in col_lower:
-                if 'subject' in col_lower or 'driver' in col_lower:
-                    column_mapping[col] = 'driver_race'
-            elif 'sex' in col_lower or 'gender' in col_lower:
-                if 'subject' in col_lower or 'driver' in col_lower:
-                    column_mapping[col] = 'driver_gender'
-            elif 'age' in col_lower:
-                if 'subject' in col_lower or 'driver' in col_lower:
-                    column_mapping[col] = 'driver_age'
-            
-            # Search and outcome mapping
-            elif 'search' in col_lower and ('conducted' in col_lower or 'performed' in col_lower):
-                column_mapping[col] = 'search_conducted'
-            elif 'contraband' in col_lower and 'found' in col_lower:
-                column_mapping[col] = 'contraband_found'
-            elif 'arrest' in col_lower and ('made' in col_lower or 'performed' in col_lower):
-                column_mapping[col] = 'arrest_made'
-            elif 'citation' in col_lower and 'issued' in col_lower:
-                column_mapping[col] = 'citation_issued'
-            elif 'warning' in col_lower and 'issued' in col_lower:
-                column_mapping[col] = 'warning_issued'
-            elif 'outcome' in col_lower or 'disposition' in col_lower:
-                column_mapping[col] = 'stop_outcome'
-            
-            # Location mapping - be more careful to avoid duplicates
-            elif 'lat' in col_lower and 'lon' not in col_lower and 'lng' not in col_lower:
-                column_mapping[col] = 'lat'
-            elif 'lon' in col_lower or 'lng' in col_lower:
-                column_mapping[col] = 'longitude'  # Use 'longitude' instead of 'lng' for Streamlit
-            elif 'district' in col_lower or 'precinct' in col_lower:
-                column_mapping[col] = 'district'
+        # Normalize all headers in one vectorized pass over the column Index
+        normalized = (df.columns.str.lower()
+                      .str.replace('_', '', regex=False)
+                      .str.replace(' ', '', regex=False))
         
-        # Apply mapping
-        df = df.rename(columns=column_mapping)
+        for col, col_lower in zip(df.columns, normalized):
+            match = _COLUMN_RULES_RE.match(col_lower)
+            if match:
+                target = _COLUMN_RULES[int(match.lastgroup[1:])][1]
+                if target:
+                    column_mapping[col] = target
         
-        # Remove any duplicate columns that might have been created
-        df = df.loc[:, ~df.columns.duplicated()]
+        # Resolve duplicates while building the new headers: the first column
+        # to claim a name keeps it, later ones are dropped in a single call
+        targets_seen = set()
+        drop_list = []
+        for col in df.columns:
+            target = column_mapping.get(col, col)
+            if target in targets_seen:
+                drop_list.append(col)
+            else:
+                targets_seen.add(target)
+        if drop_list:
+            df = df.drop(columns=drop_list)
+        
+        # Apply mapping by relabelling the column index in place - rename()
+        # would copy every column of the frame just to change the headers
+        df.columns = [column_mapping.get(col, col) for col in df.columns]
         
         # Ensure we have required columns for the app
         required_columns = ['stop_date', 'driver_race', 'driver_gender']
@@ -274,8 +886,7 @@ class RealDataFetcher:
         
         # Handle lng/longitude conversion more carefully - only if we don't already have longitude
         if 'lng' in df.columns and 'longitude' not in df.columns:
-            df['longitude'] = df['lng']
-            df = df.drop(columns=['lng'])  # Remove the original lng column to avoid confusion
+            df['longitude'] = df.pop('lng')  # Move the column instead of copying the frame via drop()
         
         return df
     
@@ -283,19 +894,24 @@ class RealDataFetcher:
         """Create metadata for the dataset."""
         
         # Calculate date range
-        date_cols = [col for col in df.columns if 'date' in col.lower()]
+        date_cols = df.columns[df.columns.str.contains('date', case=False, regex=False)].tolist()
         start_date = "Unknown"
         end_date = "Unknown"
         
         if date_cols:
+            dates = df[date_cols[0]]
+            if isinstance(dates.dtype, pd.CategoricalDtype):
+                # Only the distinct values matter for min/max - parse each of them once
+                dates = pd.Series(dates.cat.remove_unused_categories().cat.categories)
             try:
-                dates = pd.to_datetime(df[date_cols[0]], errors='coerce')
-                dates = dates.dropna()
-                if len(dates) > 0:
-                    start_date = dates.min().strftime('%Y-%m-%d')
-                    end_date = dates.max().strftime('%Y-%m-%d')
-            except:
-                pass
+                if not pd.api.types.is_datetime64_any_dtype(dates):
+                    dates = self._parse_dates(dates)
+                first, last = dates.min(), dates.max()  # NaT is skipped
+                if pd.notna(first):
+                    start_date = first.strftime('%Y-%m-%d')
+                    end_date = last.strftime('%Y-%m-%d')
+            except (ValueError, TypeError, OverflowError) as e:
+                logger.warning(f"Could not determine date range from '{date_cols[0]}': {e}")
         
         # Add optimization info if data was processed in chunks
         description = data_source['description']
@@ -304,12 +920,16 @@ class RealDataFetcher:
         elif len(df) >= 100000:
             description += " (memory optimized with efficient data types)"
         
+        memory_mb = df.attrs.get('mem_mb')
+        if memory_mb is None:
+            memory_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+        
         metadata = {
             "source": data_source['source'],
             "url": data_source['url'],
             "rows": len(df),
             "columns": list(df.columns),
-            "memory_usage": df.memory_usage(deep=True).sum() / 1024 / 1024,  # MB
+            "memory_usage": memory_mb,  # MB
             "download_time": download_time,
             "date_range": {
                 "start_date": start_date,
@@ -321,73 +941,136 @@ class RealDataFetcher:
         
         return metadata
     
+    def _parse_dates(self, values: pd.Series) -> pd.Series:
+        """Parse date strings, trying the fast ISO 8601 parser before format inference.
+        
+        Stanford files use ISO dates; the city portal exports (e.g. '01/31/2015 10:00:00 AM')
+        come back all-NaT from the ISO parser and are re-parsed with inference.
+        """
+        parsed = pd.to_datetime(values, errors='coerce', format='ISO8601', cache=True)
+        if parsed.isna().all():
+            parsed = pd.to_datetime(values, errors='coerce', cache=True)
+        return parsed
+    
     def optimize_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
         """Optimize data types to reduce memory usage by 50-70%."""
-        logger.info(f"Optimizing data types. Original memory: {df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB")
+        # deep=True walks every string in the frame, so the original size is only measured
+        # when it will be logged
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Optimizing data types. Original memory: {df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB")
         
         for col in df.columns:
-            if df[col].dtype == 'object':
+            dtype = df[col].dtype
+            if col in FLOAT32_COLUMNS and pd.api.types.is_float_dtype(dtype):
+                # float32 is ~1 m precision for coordinates, plenty for the maps
+                df[col] = df[col].astype('float32')
+            elif dtype == 'float64':
+                df[col] = pd.to_numeric(df[col], downcast='float')
+            elif dtype == 'int64':
+                df[col] = self._downcast_numeric(df[col])
+            elif dtype == 'object':
+                if not self._looks_numeric(df[col]):
+                    # Clearly text - skip allocating a to_numeric result just to discard it
+                    df[col] = self._to_category(df[col])
+                    continue
                 try:
                     # Try to convert to numeric first
                     numeric_series = pd.to_numeric(df[col], errors='coerce')
-                    if not numeric_series.isna().all():
-                        # If successful conversion, use appropriate integer type
-                        if numeric_series.min() >= 0:
-                            if numeric_series.max() <= 255:
-                                df[col] = numeric_series.astype('uint8')
-                            elif numeric_series.max() <= 65535:
-                                df[col] = numeric_series.astype('uint16')
-                            elif numeric_series.max() <= 4294967295:
-                                df[col] = numeric_series.astype('uint32')
-                            else:
-                                df[col] = numeric_series.astype('uint64')
-                        else:
-                            if numeric_series.min() >= -128 and numeric_series.max() <= 127:
-                                df[col] = numeric_series.astype('int8')
-                            elif numeric_series.min() >= -32768 and numeric_series.max() <= 32767:
-                                df[col] = numeric_series.astype('int16')
-                            elif numeric_series.min() >= -2147483648 and numeric_series.max() <= 2147483647:
-                                df[col] = numeric_series.astype('int32')
-                            else:
-                                df[col] = numeric_series.astype('int64')
-                    else:
-                        # Keep as string but convert to category if low cardinality
-                        if df[col].nunique() / len(df) < 0.5:  # Less than 50% unique values
-                            df[col] = df[col].astype('category')
-                except:
-                    # Keep as string but convert to category if low cardinality
-                    if df[col].nunique() / len(df) < 0.5:
-                        df[col] = df[col].astype('category')
-            elif df[col].dtype == 'float64':
-                df[col] = pd.to_numeric(df[col], downcast='float')
-            elif df[col].dtype == 'int64':
-                df[col] = pd.to_numeric(df[col], downcast='integer')
+                except (ValueError, TypeError):
+                    numeric_series = None  # e.g. lists or dicts in the cells
+                
+                if numeric_series is None or numeric_series.isna().any():
+                    # Unparseable or missing values can't go into an integer column -
+                    # keep as string but convert to category if low cardinality
+                    df[col] = self._to_category(df[col])
+                    continue
+                
+                # Fully numeric, use the narrowest type that holds it
+                df[col] = self._downcast_numeric(numeric_series)
+            # Other dtypes (already narrow numerics, category, datetime, bool) are left as-is
         
-        logger.info(f"Optimized memory: {df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB")
+        # Measured once here at any log level and kept on the frame, so _create_metadata
+        # doesn't walk the strings again
+        df.attrs['mem_mb'] = df.memory_usage(deep=True).sum() / 1024 / 1024
+        logger.debug(f"Optimized memory: {df.attrs['mem_mb']:.2f} MB")
         return df
     
-    def process_data_in_chunks(self, file_obj, file_type: str, chunk_size: int = 50000) -> pd.DataFrame:
-        """Process large files in chunks to manage memory efficiently."""
+    def _downcast_numeric(self, series: pd.Series) -> pd.Series:
+        """Narrow a NaN-free numeric column to the smallest integer dtype that holds it.
+        
+        Columns with fractional (or infinite) values stay floating point, downcast to
+        float32 where that is lossless.
+        """
+        arr = series.to_numpy()
+        if arr.size == 0:
+            return series
+        if arr.dtype.kind == 'f' and not (np.isfinite(arr).all() and np.array_equal(arr, np.trunc(arr))):
+            return pd.to_numeric(series, downcast='float')
+        
+        dtype = _choose_int_dtype(arr.min(), arr.max())
+        return pd.Series(arr.astype(dtype, copy=False), index=series.index, name=series.name)
+    
+    def _looks_numeric(self, series: pd.Series, sample_size: int = 64) -> bool:
+        """Cheap screen on a sample of non-null values before attempting pd.to_numeric.
+        
+        Only string samples are checked against _NUMERIC_RE (at least half must match);
+        anything else (mixed objects, bools, decimals) goes on to the full conversion.
+        """
+        sample = series.dropna().head(sample_size)
+        if pd.api.types.infer_dtype(sample, skipna=False) != 'string':
+            return True
+        hits = sum(1 for value in sample if _NUMERIC_RE.match(value))
+        return hits >= 0.5 * len(sample)
+    
+    def _to_category(self, series: pd.Series, sample_size: int = 10000,
+                     max_categories: int = 2 ** 16) -> pd.Series:
+        """Convert a string column to category if less than 50% of its values are unique.
+        
+        A sample of the leading rows rejects high-cardinality columns cheaply; otherwise a
+        single factorize() both counts the uniques and provides the codes, so the column
+        is hashed once rather than once for nunique() and again for astype('category').
+        Columns with more than max_categories uniques are left as strings.
+        """
+        sample = series.head(sample_size)
+        if len(sample) == 0 or sample.nunique() / len(sample) >= 0.5:
+            return series
+        
+        codes, uniques = pd.factorize(series, sort=False)
+        if len(uniques) >= 0.5 * len(series) or len(uniques) > max_categories:
+            return series
+        return pd.Series(pd.Categorical.from_codes(codes, categories=uniques),
+                         index=series.index, name=series.name)
+    
+    def process_data_in_chunks(self, file_obj, file_type: str, chunk_size: int = 50000,
+                               dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """Process large files in chunks to manage memory efficiently.
+        
+        dtypes maps column names to pandas dtypes to read them as directly, skipping
+        inference for those columns; columns missing from the file are ignored.
+        """
         chunks = []
         total_rows = 0
         
         logger.info(f"Processing data in chunks of {chunk_size} rows...")
         
         try:
+            if file_type == 'csv' and pacsv is not None:
+                # Parse with Arrow's multi-threaded reader and convert to pandas once
+                final_df = self._read_csv_arrow(file_obj, max_rows=500000, dtypes=dtypes)
+                final_df = self._standardize_columns(final_df)
+                final_df = self.optimize_dtypes(final_df)
+                
+                logger.info(f"Final dataset: {len(final_df)} rows, {len(final_df.columns)} columns")
+                return final_df
+            
             if file_type == 'csv':
                 # Process CSV in chunks
                 chunk_iter = pd.read_csv(file_obj, chunksize=chunk_size, low_memory=False, 
-                                       encoding='utf-8', on_bad_lines='skip')
+                                       encoding='utf-8', on_bad_lines='skip', dtype=dtypes)
                 
                 for i, chunk in enumerate(chunk_iter):
                     logger.info(f"Processing chunk {i+1}, rows: {len(chunk)}")
                     
-                    # Optimize chunk data types
-                    chunk = self.optimize_dtypes(chunk)
-                    
-                    # Standardize columns for this chunk
-                    chunk = self._standardize_columns(chunk)
-                    
                     chunks.append(chunk)
                     total_rows += len(chunk)
                     
@@ -406,15 +1089,21 @@ class RealDataFetcher:
                     df = df.head(500000)
                     logger.info(f"Limited Excel data to 500K rows for cloud compatibility")
                 
-                df = self.optimize_dtypes(df)
-                df = self._standardize_columns(df)
                 chunks.append(df)
                 total_rows = len(df)
             
             # Combine all chunks efficiently
             if chunks:
                 logger.info(f"Combining {len(chunks)} chunks with total {total_rows} rows...")
-                final_df = pd.concat(chunks, ignore_index=True)
+                # Chunks of one file share its header; standardizing happens once below
+                if not all(chunk.columns.equals(chunks[0].columns) for chunk in chunks):
+                    raise ValueError("CSV chunks have differing columns")
+                if len(chunks) == 1:
+                    final_df = chunks[0]  # Excel and small CSVs - nothing to concatenate
+                else:
+                    final_df = pd.concat(chunks, ignore_index=True)
+                
+                final_df = self._standardize_columns(final_df)
                 
                 # Final optimization pass
                 final_df = self.optimize_dtypes(final_df)
@@ -426,6 +1115,14 @@ class RealDataFetcher:
                 
         except Exception as e:
             logger.error(f"Error in chunked processing: {e}")
+            # The failed attempt may have consumed part of the stream. A live download can't
+            # be rewound, and reading on from the middle would take a data row as the header,
+            # so let the caller retry or move to the next source instead. seek() is tried
+            # directly: SpooledTemporaryFile has no seekable() before Python 3.11
+            try:
+                file_obj.seek(0)
+            except (AttributeError, io.UnsupportedOperation, OSError):
+                raise e from None
             # Fallback to regular processing with row limit
             logger.info("Falling back to regular processing with 100K row limit")
             if file_type == 'csv':
@@ -434,6 +1131,64 @@ class RealDataFetcher:
             else:
                 df = pd.read_excel(file_obj, engine='openpyxl', nrows=100000)
             
-            df = self.optimize_dtypes(df)
+            # Same order as above, so the memory figure optimize_dtypes records is the final frame's
             df = self._standardize_columns(df)
-            return df
\ No newline at end of file
+            df = self.optimize_dtypes(df)
+            return df
+    
+    def _read_csv_arrow(self, file_obj, max_rows: int,
+                        dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """Read a CSV stream with pyarrow, stopping once max_rows rows have been parsed.
+        
+        Malformed rows are skipped, matching on_bad_lines='skip' in the pandas reader.
+        Columns not in dtypes are read as strings: the streaming reader fixes each column's
+        type from the first block, and Stanford files have columns that are empty or numeric
+        early on and hold text later. Once all rows are in, string columns that parse as
+        numbers or booleans throughout are converted.
+        """
+        # Read the header ourselves so every column can be given a type up front
+        header = file_obj.readline().decode('utf-8-sig')
+        if not header.strip():
+            return pd.DataFrame()
+        column_names = next(csv.reader([header]))
+        
+        # Arrow equivalents of the pandas dtypes; dictionary columns become categoricals
+        dtypes = dtypes or {}
+        column_types = {col: ARROW_TYPES[dtypes[col]] if col in dtypes else pa.string()
+                        for col in column_names}
+        reader = pacsv.open_csv(
+            file_obj,
+            read_options=pacsv.ReadOptions(block_size=ARROW_CSV_BLOCK_SIZE, column_names=column_names),
+            parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+            convert_options=pacsv.ConvertOptions(strings_can_be_null=True, column_types=column_types)
+        )
+        
+        batches = []
+        total_rows = 0
+        for batch in reader:
+            batches.append(batch)
+            total_rows += batch.num_rows
+            logger.debug(f"Parsed batch {len(batches)}, rows: {batch.num_rows}")
+            
+            # Same cap as the pandas path
+            if total_rows >= max_rows:
+                logger.info(f"Reached row limit of {max_rows:,} for cloud compatibility")
+                break
+        
+        table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, max_rows)
+        del batches  # the table now holds the only references to the Arrow buffers
+        
+        # Infer the untyped columns over every row read rather than the first block
+        for i, name in enumerate(table.column_names):
+            if name in dtypes:
+                continue
+            for target in (pa.int64(), pa.float64(), pa.bool_()):
+                try:
+                    table = table.set_column(i, name, table.column(i).cast(target))
+                    break
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    continue
+        
+        # split_blocks avoids consolidating columns into 2D blocks (an extra copy), and
+        # self_destruct frees each Arrow column as soon as it has been converted
+        return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -1,33 +1,282 @@
+from __future__ import annotations
+
 import sqlite3
-import pandas as pd
+import io
 import json
+import functools
 import hashlib
 import time
-from typing import Optional, Dict, Any
+import heapq
+import threading
+from contextlib import nullcontext
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Tuple
 import logging
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.exc import SQLAlchemyError
-import redis
-from config import DATABASE_URL, REDIS_URL, CACHE_EXPIRY
+from config import DATABASE_URL, REDIS_URL, CACHE_EXPIRY, SCHEMA_CACHE_TTL
 import re
 
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional - fall back to md5
+    xxhash = None
+
+# pandas and redis are imported where they're used, so importing this module (e.g. for
+# the cache helpers or table naming) doesn't pay their start-up cost
+if TYPE_CHECKING:
+    import pandas as pd
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+if xxhash is not None:
+    def _hash_key(key: str) -> str:
+        """Non-cryptographic digest for cache keys."""
+        return xxhash.xxh3_64_hexdigest(key)
+else:
+    def _hash_key(key: str) -> str:
+        """Non-cryptographic digest for cache keys."""
+        return hashlib.md5(key.encode()).hexdigest()
+
+if orjson is not None:
+    # numpy scalars/arrays come straight from DataFrame.to_dict('records');
+    # non-str keys are stringified like json.dumps does
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    
+    def _json_dumps(value: Any) -> bytes:
+        return orjson.dumps(value, option=_ORJSON_OPTIONS)
+    
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(value: Any) -> bytes:
+        return json.dumps(value).encode()
+    
+    _json_loads = json.loads  # accepts bytes as well as str
+
 # Class-level flag to avoid repeated cache status logging
 _cache_status_logged = False
 
+
+# Precompiled patterns for _table_name_for
+_DEPT_WORDS_RE = re.compile(r' ?police department|department| ?police')
+_SEPARATORS_RE = re.compile(r'[ -]+')
+_UNDERSCORES_RE = re.compile(r'_{2,}')
+
+
+@functools.lru_cache(maxsize=256)
+def _table_name_for(department: str) -> str:
+    """Generate clean table name from department name (memoized - called on every query)."""
+    clean_dept = department.lower()
+    # Remove various forms of "police department" in one pass
+    clean_dept = _DEPT_WORDS_RE.sub('', clean_dept)
+    # Clean up spaces and special characters, collapsing runs of underscores
+    clean_dept = _SEPARATORS_RE.sub('_', clean_dept)
+    clean_dept = _UNDERSCORES_RE.sub('_', clean_dept).strip('_')
+    return f"police_data_{clean_dept}"
+
+# Column name cleanup for store_police_data
+_COL_SEPARATOR_RE = re.compile(r'[ .-]')
+_COL_INVALID_RE = re.compile(r'[^\w]')
+
+# Standalone 'police_data' placeholder in generated SQL, not 'police_data_xxx'
+_TABLE_PLACEHOLDER_RE = re.compile(r'\bpolice_data\b(?!_)')
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_text(query: str):
+    """Build the TextClause for a query once; LLM and template queries repeat a lot."""
+    return text(query)
+
+# Arrow IPC files start with this magic; anything else in the cache is JSON records
+_FEATHER_MAGIC = b'ARROW1'
+
+def _df_to_bytes(df: pd.DataFrame) -> bytes:
+    """Serialize a DataFrame for the cache: LZ4-compressed Feather (Arrow IPC), or JSON
+    records written straight from the columns when pyarrow is missing or can't store it."""
+    df = df.reset_index(drop=True)
+    try:
+        buf = io.BytesIO()
+        df.to_feather(buf, compression='lz4')
+        return buf.getvalue()
+    except Exception as e:
+        # e.g. no pyarrow, or object columns holding mixed types
+        logger.debug(f"Feather encode failed, caching as JSON: {e}")
+        return df.to_json(orient='records', date_format='iso').encode()
+
+def _df_from_bytes(data: bytes, dtype_backend: Optional[str] = None) -> pd.DataFrame:
+    import pandas as pd
+    # pandas rejects dtype_backend=None, so only pass it when one was asked for
+    kwargs = {'dtype_backend': dtype_backend} if dtype_backend else {}
+    if data[:len(_FEATHER_MAGIC)] == _FEATHER_MAGIC:
+        return pd.read_feather(io.BytesIO(data), **kwargs)
+    return pd.read_json(io.BytesIO(data), orient='records', **kwargs)
+
+# Rows per executemany batch when storing a table
+INSERT_CHUNK_SIZE = 10000
+
+# table_name -> schema dict from get_table_schema, shared across DatabaseManager instances
+_schema_cache: Dict[str, Dict] = {}
+
+# Each table's version, stamped by store_police_data in the database itself so every
+# worker process (and a restarted one) sees the same value. Caches here and in other
+# modules - including the shared Redis query cache - key on it so they go stale with the table
+TABLE_VERSION_TABLE = "_table_versions"
+_TABLE_VERSION_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {TABLE_VERSION_TABLE} ("
+    "table_name TEXT PRIMARY KEY, version INTEGER)"
+)
+
+# In-process copy of the versions, table_name -> (read_at, version), re-read after
+# TABLE_VERSION_TTL seconds so a reload by another worker is picked up promptly
+TABLE_VERSION_TTL = 1.0
+_table_versions: Dict[str, Tuple[float, int]] = {}
+
+def table_version(table_name: str) -> int:
+    """Return a value that changes whenever table_name is re-stored (0 if never stored)."""
+    cached = _table_versions.get(table_name)
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < TABLE_VERSION_TTL:
+        return cached[1]
+    try:
+        with _get_engine(DATABASE_URL).connect() as conn:
+            version = conn.execute(
+                _compile_text(f"SELECT version FROM {TABLE_VERSION_TABLE} WHERE table_name = :table_name"),
+                {'table_name': table_name}
+            ).scalar()
+    except SQLAlchemyError:
+        version = None  # the versions table doesn't exist until the first store
+    _table_versions[table_name] = (now, version or 0)
+    return version or 0
+
+# Schema probes (columns, sample rows, distinct categorical values) persisted in the
+# database itself, so a new process reads one row instead of re-scanning each table.
+# Rows are deleted when store_police_data replaces their table
+SCHEMA_PROBE_TABLE = "_schema_cache"
+_SCHEMA_PROBE_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {SCHEMA_PROBE_TABLE} ("
+    "table_name TEXT PRIMARY KEY, columns TEXT, race_values TEXT, "
+    "outcome_values TEXT, sample_json TEXT, computed_at INTEGER)"
+)
+
+# Recent execute_sql_query results, already materialized: key -> (expires_at, table_name, df).
+# Dashboards re-issue the same queries on every rerun, and a hit here skips the Redis
+# round-trip and the Feather decode. Least recently used entries are evicted first.
+# Every Streamlit session thread shares it, so all access goes through the lock
+_QUERY_CACHE_MAX = 64
+_query_df_cache: "OrderedDict[str, Tuple[float, str, pd.DataFrame]]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+def _query_cache_get(key: str) -> Optional[pd.DataFrame]:
+    with _query_cache_lock:
+        entry = _query_df_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _query_df_cache[key]
+            return None
+        _query_df_cache.move_to_end(key)
+    # Shallow copy: callers may add or rename columns without affecting the cached frame
+    return entry[2].copy(deep=False)
+
+def _query_cache_put(key: str, table_name: str, df: pd.DataFrame):
+    with _query_cache_lock:
+        _query_df_cache[key] = (time.monotonic() + CACHE_EXPIRY, table_name, df)
+        _query_df_cache.move_to_end(key)
+        while len(_query_df_cache) > _QUERY_CACHE_MAX:
+            _query_df_cache.popitem(last=False)
+
+def _query_cache_purge(table_name: str):
+    """Drop cached query results for a table that has just been replaced."""
+    with _query_cache_lock:
+        for key in [k for k, entry in _query_df_cache.items() if entry[1] == table_name]:
+            del _query_df_cache[key]
+
+@functools.lru_cache(maxsize=None)
+def _get_engine(url: str):
+    """Return the process-wide engine (and its connection pool) for url.
+    
+    SQLite connections are tuned as they are opened: WAL so readers don't block on
+    store_police_data's writes, NORMAL sync to skip an fsync per commit, in-memory temp
+    storage and a 64 MB page cache.
+    """
+    engine = create_engine(url)
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_conn, _connection_record):
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-65536")
+            cursor.close()
+    return engine
+
+# Redis connections are shared by every DatabaseManager (one is built per Streamlit
+# rerun); callers block briefly for a free connection instead of opening new ones
+_redis_pool = None
+
+def _get_redis_client():
+    """Return a Redis client on the shared pool; raises ImportError without redis-py."""
+    global _redis_pool
+    import redis
+    if _redis_pool is None:
+        # socket_timeout bounds every command on an established connection, so a
+        # stalled server fails fast into the memory cache instead of hanging the page
+        _redis_pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL, max_connections=16, timeout=1, socket_connect_timeout=1,
+            socket_timeout=0.25, socket_keepalive=True, health_check_interval=30
+        )
+    return redis.Redis(connection_pool=_redis_pool)
+
+# Circuit breaker: after REDIS_TRIP_FAILURES failed commands within REDIS_TRIP_WINDOW
+# seconds, skip Redis for REDIS_COOLDOWN seconds and use the memory cache. Module-level
+# so it survives DatabaseManager being recreated on every rerun
+REDIS_TRIP_FAILURES = 5
+REDIS_TRIP_WINDOW = 10.0
+REDIS_COOLDOWN = 30.0
+_redis_failures: deque = deque(maxlen=REDIS_TRIP_FAILURES)
+_redis_cooldown_until = 0.0
+
+def _redis_failed():
+    """Record a failed Redis command, opening the circuit if failures are piling up."""
+    global _redis_cooldown_until
+    now = time.monotonic()
+    _redis_failures.append(now)
+    if len(_redis_failures) == REDIS_TRIP_FAILURES and now - _redis_failures[0] <= REDIS_TRIP_WINDOW:
+        _redis_cooldown_until = now + REDIS_COOLDOWN
+        _redis_failures.clear()
+        logger.warning(f"Redis unresponsive, using in-memory cache for {REDIS_COOLDOWN:.0f}s")
+
 class DatabaseManager:
     def __init__(self):
         global _cache_status_logged
-        self.engine = create_engine(DATABASE_URL)
+        self.engine = _get_engine(DATABASE_URL)
         self.redis_client = None
         self._redis_available = False
         
-        # Try to connect to Redis quietly, fallback to in-memory cache
+        # In-memory fallback: cache_key -> (expires_at, value) on the monotonic clock,
+        # plus a min-heap of (expires_at, cache_key) for batched eviction
+        self._memory_cache: Dict[str, Tuple[float, Any]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._sets_since_purge = 0
+        
+        # Try to connect to Redis quietly, fallback to in-memory cache. While the
+        # circuit breaker is open the ping is skipped too
         try:
-            self.redis_client = redis.from_url(REDIS_URL, decode_responses=True, socket_connect_timeout=1)
-            self.redis_client.ping()
+            if time.monotonic() < _redis_cooldown_until:
+                raise ConnectionError("Redis circuit open")
+            self.redis_client = _get_redis_client()
+            try:
+                self.redis_client.ping()
+            except Exception:
+                _redis_failed()
+                raise
             self._redis_available = True
             if not _cache_status_logged:
                 logger.info("Redis cache connection established")
@@ -35,118 +284,198 @@ class DatabaseManager:
         except Exception:
             # Silent fallback to in-memory cache
             self._redis_available = False
-            self._memory_cache = {}
             if not _cache_status_logged:
                 logger.info("Using in-memory cache (Redis not available)")
                 _cache_status_logged = True
     
     def _get_table_name(self, department: str) -> str:
         """Generate clean table name from department name."""
-        clean_dept = department.lower()
-        # Remove various forms of "police department"
-        clean_dept = clean_dept.replace(' police department', '')
-        clean_dept = clean_dept.replace('police department', '')
-        clean_dept = clean_dept.replace('department', '')
-        clean_dept = clean_dept.replace(' police', '')
-        clean_dept = clean_dept.replace('police', '')
-        # Clean up spaces and special characters
-        clean_dept = clean_dept.replace(' ', '_')
-        clean_dept = clean_dept.replace('-', '_')
-        clean_dept = clean_dept.strip('_')  # Remove leading/trailing underscores
-        # Remove duplicate underscores
-        while '__' in clean_dept:
-            clean_dept = clean_dept.replace('__', '_')
-        return f"police_data_{clean_dept}"
+        return _table_name_for(department)
+    
+    def _quote(self, identifier: str) -> str:
+        """Quote a table name for interpolation into SQL, using the engine's dialect rules."""
+        return self.engine.dialect.identifier_preparer.quote_identifier(identifier)
+    
+    def _use_redis(self) -> bool:
+        """Whether cache operations should go to Redis right now."""
+        return (self._redis_available and self.redis_client is not None
+                and time.monotonic() >= _redis_cooldown_until)
+    
+    def session(self):
+        """Open a connection to share across several calls, e.g.
+        
+            with db.session() as conn:
+                schema = db.get_table_schema(dept, conn=conn)
+                sample = db.get_sample_data(dept, conn=conn)
+        """
+        return self.engine.connect()
+    
+    def _connection(self, conn=None):
+        """Use the caller's connection if given (left open), else check one out of the pool."""
+        return nullcontext(conn) if conn is not None else self.engine.connect()
     
     def _get_cache_key(self, key: str) -> str:
         """Generate a cache key."""
-        return f"police_data:{hashlib.md5(key.encode()).hexdigest()}"
+        return f"police_data:{_hash_key(key)}"
+    
+    def _memory_set(self, cache_key: str, value: Any, expiry: int):
+        """Store a value in the in-memory cache, evicting expired entries every 64 sets."""
+        expires_at = time.monotonic() + expiry
+        self._memory_cache[cache_key] = (expires_at, value)
+        heapq.heappush(self._expiry_heap, (expires_at, cache_key))
+        
+        self._sets_since_purge += 1
+        if self._sets_since_purge >= 64:
+            self._sets_since_purge = 0
+            now = time.monotonic()
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expired_at, expired_key = heapq.heappop(self._expiry_heap)
+                entry = self._memory_cache.get(expired_key)
+                # Skip heap entries for keys that were overwritten since
+                if entry is not None and entry[0] == expired_at:
+                    del self._memory_cache[expired_key]
+    
+    def _memory_get(self, cache_key: str) -> Optional[Any]:
+        """Return an unexpired in-memory value; expired ones are left for _memory_set to evict."""
+        entry = self._memory_cache.get(cache_key)
+        return entry[1] if entry is not None and entry[0] > time.monotonic() else None
     
     def cache_set(self, key: str, value: Any, expiry: int = CACHE_EXPIRY):
         """Set a value in cache."""
+        cache_key = self._get_cache_key(key)
         try:
-            cache_key = self._get_cache_key(key)
-            if self._redis_available and self.redis_client:
-                self.redis_client.setex(cache_key, expiry, json.dumps(value))
-            else:
-                self._memory_cache[cache_key] = {
-                    'value': value,
-                    'expiry': time.time() + expiry
-                }
+            if self._use_redis():
+                self.redis_client.setex(cache_key, expiry, _json_dumps(value))
+                return
+        except Exception:
+            _redis_failed()
+            pass  # Silently fallback to memory cache
+        self._memory_set(cache_key, value, expiry)
+    
+    def cache_delete(self, key: str):
+        """Remove a value from cache."""
+        cache_key = self._get_cache_key(key)
+        try:
+            if self._use_redis():
+                self.redis_client.delete(cache_key)
+        except Exception:
+            _redis_failed()
+            pass
+        self._memory_cache.pop(cache_key, None)
+    
+    def cache_set_df(self, key: str, df: pd.DataFrame, expiry: int = CACHE_EXPIRY):
+        """Cache a DataFrame as Feather or JSON bytes (columnar, no per-row Python objects)."""
+        try:
+            payload = _df_to_bytes(df)
+        except Exception as e:
+            # Neither Feather nor JSON could encode it (e.g. non-serializable objects)
+            logger.debug(f"Not caching DataFrame for {key}: {e}")
+            return
+        
+        cache_key = self._get_cache_key(key)
+        try:
+            if self._use_redis():
+                self.redis_client.setex(cache_key, expiry, payload)
+                return
+        except Exception:
+            _redis_failed()
+            pass  # Silently fallback to memory cache
+        self._memory_set(cache_key, payload, expiry)
+    
+    def cache_get_df(self, key: str, dtype_backend: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Get a DataFrame stored with cache_set_df; each call returns a fresh frame.
+        
+        dtype_backend is passed to the pandas reader, so callers can get back the same
+        column types they cached.
+        """
+        cache_key = self._get_cache_key(key)
+        payload = None
+        try:
+            if self._use_redis():
+                payload = self.redis_client.get(cache_key)
         except Exception:
-            # Silently fallback to memory cache
-            if not hasattr(self, '_memory_cache'):
-                self._memory_cache = {}
-            cache_key = self._get_cache_key(key)
-            self._memory_cache[cache_key] = {
-                'value': value,
-                'expiry': time.time() + expiry
-            }
+            _redis_failed()
+            payload = None
+        if payload is None:
+            payload = self._memory_get(cache_key)
+        if payload is None:
+            return None
+        
+        try:
+            return _df_from_bytes(payload, dtype_backend)
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable cached DataFrame for {key}: {e}")
+            return None
+    
+    def cache_mset(self, items: Dict[str, Any], expiry: int = CACHE_EXPIRY):
+        """Set several values in cache with a single Redis round-trip."""
+        try:
+            if self._use_redis():
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipe.setex(self._get_cache_key(key), expiry, _json_dumps(value))
+                pipe.execute()
+                return
+        except Exception:
+            _redis_failed()
+            pass  # Fall through to the per-key path, which falls back to memory
+        for key, value in items.items():
+            self.cache_set(key, value, expiry)
+    
+    def cache_mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values from cache with a single Redis round-trip, in the order of keys."""
+        try:
+            if self._use_redis():
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key in keys:
+                    pipe.get(self._get_cache_key(key))
+                return [_json_loads(cached) if cached else None for cached in pipe.execute()]
+        except Exception:
+            _redis_failed()
+            pass
+        return [self.cache_get(key) for key in keys]
     
     def cache_get(self, key: str) -> Optional[Any]:
         """Get a value from cache."""
+        cache_key = self._get_cache_key(key)
         try:
-            cache_key = self._get_cache_key(key)
-            if self._redis_available and self.redis_client:
+            if self._use_redis():
                 cached = self.redis_client.get(cache_key)
-                return json.loads(cached) if cached else None
-            else:
-                if not hasattr(self, '_memory_cache'):
-                    self._memory_cache = {}
-                cached = self._memory_cache.get(cache_key)
-                if cached and cached['expiry'] > time.time():
-                    return cached['value']
-                elif cached:
-                    del self._memory_cache[cache_key]
-                return None
+                return _json_loads(cached) if cached else None
         except Exception:
-            # Silently fallback to memory cache
-            if not hasattr(self, '_memory_cache'):
-                return None
-            cached = self._memory_cache.get(self._get_cache_key(key))
-            if cached and cached['expiry'] > time.time():
-                return cached['value']
-            return None
+            _redis_failed()
+            pass  # Silently fallback to memory cache
+        return self._memory_get(cache_key)
     
     def store_police_data(self, department: str, data: pd.DataFrame, metadata: Dict):
         """Store police data in the database."""
+        import pandas as pd
+        
         try:
             table_name = self._get_table_name(department)
             
-            # Clean the dataframe to avoid column issues
-            clean_data = data.copy()
-            
-            # Remove any duplicate columns
-            clean_data = clean_data.loc[:, ~clean_data.columns.duplicated()]
-            
-            # Clean column names to avoid SQLite issues
-            clean_columns = {}
-            for col in clean_data.columns:
-                # Replace problematic characters in column names
-                clean_col = str(col).replace(' ', '_').replace('-', '_').replace('.', '_')
-                clean_col = ''.join(c for c in clean_col if c.isalnum() or c == '_')
-                clean_col = clean_col.strip('_')
-                clean_columns[col] = clean_col
+            # Clean the dataframe to avoid column issues. A shallow copy shares the
+            # caller's column data but lets the headers below be replaced without
+            # touching the caller's frame
+            duplicated = data.columns.duplicated()
+            if duplicated.any():
+                # Remove any duplicate columns (loc returns a new frame)
+                clean_data = data.loc[:, ~duplicated]
+            else:
+                clean_data = data.copy(deep=False)
             
-            clean_data = clean_data.rename(columns=clean_columns)
+            # Clean column names to avoid SQLite issues: separators become '_', any other
+            # non-alphanumeric character is dropped (vectorized over the column Index)
+            clean_data.columns = (clean_data.columns.astype(str)
+                                  .str.replace(_COL_SEPARATOR_RE, '_', regex=True)
+                                  .str.replace(_COL_INVALID_RE, '', regex=True)
+                                  .str.strip('_'))
             
             # Ensure no duplicate column names after cleaning
             if len(clean_data.columns) != len(set(clean_data.columns)):
                 logger.warning("Duplicate column names detected after cleaning, removing duplicates")
                 clean_data = clean_data.loc[:, ~clean_data.columns.duplicated()]
             
-            # Drop existing table first to avoid conflicts
-            with self.engine.connect() as conn:
-                try:
-                    conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
-                    conn.execute(text(f"DROP TABLE IF EXISTS {table_name}_metadata"))
-                    conn.commit()
-                except Exception:
-                    pass  # Table might not exist, which is fine
-            
-            # Store the cleaned data
-            clean_data.to_sql(table_name, self.engine, if_exists='replace', index=False)
-            
             # Store metadata (convert lists to JSON strings)
             metadata_table = f"{table_name}_metadata"
             metadata_copy = metadata.copy()
@@ -154,10 +483,40 @@ class DatabaseManager:
             # Convert lists to JSON strings for storage
             for key, value in metadata_copy.items():
                 if isinstance(value, (list, dict)):
-                    metadata_copy[key] = json.dumps(value)
+                    metadata_copy[key] = _json_dumps(value).decode()
             
             metadata_df = pd.DataFrame([metadata_copy])
-            metadata_df.to_sql(metadata_table, self.engine, if_exists='replace', index=False)
+            
+            # Replace both tables in one transaction. Rows go in through executemany in
+            # batches - method='multi' would exceed SQLite's bound-variable limit on
+            # wide frames, and a single transaction avoids a commit per batch
+            with self.engine.begin() as conn:
+                # Drop existing table first to avoid conflicts
+                conn.execute(text(f"DROP TABLE IF EXISTS {self._quote(table_name)}"))
+                conn.execute(text(f"DROP TABLE IF EXISTS {self._quote(metadata_table)}"))
+                
+                # Store the cleaned data
+                clean_data.to_sql(table_name, conn, if_exists='replace', index=False,
+                                  chunksize=INSERT_CHUNK_SIZE)
+                metadata_df.to_sql(metadata_table, conn, if_exists='replace', index=False)
+                
+                conn.execute(_compile_text(_SCHEMA_PROBE_DDL))
+                conn.execute(_compile_text(f"DELETE FROM {SCHEMA_PROBE_TABLE} WHERE table_name = :table_name"),
+                             {'table_name': table_name})
+                
+                # A nanosecond timestamp is unique across processes and restarts, unlike a counter
+                version = time.time_ns()
+                conn.execute(_compile_text(_TABLE_VERSION_DDL))
+                conn.execute(_compile_text(f"INSERT OR REPLACE INTO {TABLE_VERSION_TABLE} "
+                                           "(table_name, version) VALUES (:table_name, :version)"),
+                             {'table_name': table_name, 'version': version})
+            
+            # Drop cached copies of the old table
+            _schema_cache.pop(table_name, None)
+            _table_versions[table_name] = (time.monotonic(), version)
+            _query_cache_purge(table_name)
+            self.cache_delete(f"schema_{table_name}")
+            self.cache_delete(f"data_{table_name}")
             
             logger.info(f"Data stored for {department}: {len(clean_data)} rows in table {table_name}")
             return table_name
@@ -166,21 +525,82 @@ class DatabaseManager:
             logger.error(f"Error storing data: {e}")
             return None
     
-    def get_police_data(self, department: str) -> Optional[pd.DataFrame]:
+    def load_table_probe(self, table_name: str, max_age: int = SCHEMA_CACHE_TTL) -> Optional[Dict]:
+        """Return the persisted schema probe for a table if it is newer than max_age seconds."""
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    _compile_text(
+                        f"SELECT columns, race_values, outcome_values, sample_json FROM {SCHEMA_PROBE_TABLE} "
+                        "WHERE table_name = :table_name AND computed_at >= strftime('%s', 'now') - :max_age"
+                    ),
+                    {'table_name': table_name, 'max_age': int(max_age)}
+                ).mappings().first()
+        except SQLAlchemyError:
+            return None  # No probe table yet
+        if row is None:
+            return None
+        return {
+            'columns': json.loads(row['columns']),
+            'race_values': json.loads(row['race_values']) if row['race_values'] else None,
+            'outcome_values': json.loads(row['outcome_values']) if row['outcome_values'] else None,
+            'sample_data': json.loads(row['sample_json'])
+        }
+    
+    def save_table_probe(self, table_name: str, columns: List[str], sample_data: List[Dict],
+                         race_values: Optional[List] = None, outcome_values: Optional[List] = None):
+        """Persist a schema probe for load_table_probe."""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(_compile_text(_SCHEMA_PROBE_DDL))
+                conn.execute(
+                    _compile_text(
+                        f"INSERT OR REPLACE INTO {SCHEMA_PROBE_TABLE} VALUES "
+                        "(:table_name, :columns, :race_values, :outcome_values, :sample_json, "
+                        "CAST(strftime('%s', 'now') AS INTEGER))"
+                    ),
+                    {
+                        'table_name': table_name,
+                        'columns': json.dumps(columns),
+                        'race_values': json.dumps(race_values, default=str) if race_values is not None else None,
+                        'outcome_values': json.dumps(outcome_values, default=str) if outcome_values is not None else None,
+                        # default=str covers BLOB sample values
+                        'sample_json': json.dumps(sample_data, default=str)
+                    }
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not persist schema probe for {table_name}: {e}")
+    
+    def delete_table_probe(self, table_name: str):
+        """Forget the persisted schema probe for a table."""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(_compile_text(_SCHEMA_PROBE_DDL))
+                conn.execute(_compile_text(f"DELETE FROM {SCHEMA_PROBE_TABLE} WHERE table_name = :table_name"),
+                             {'table_name': table_name})
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not delete schema probe for {table_name}: {e}")
+    
+    def get_police_data(self, department: str, conn=None) -> Optional[pd.DataFrame]:
         """Retrieve police data from database."""
+        import pandas as pd
+        
         try:
             table_name = self._get_table_name(department)
             
-            # Check cache first
-            cached_data = self.cache_get(f"data_{table_name}")
-            if cached_data:
-                return pd.DataFrame(cached_data)
+            # Check cache first, with the same Arrow-backed columns as a database read
+            cached_data = self.cache_get_df(f"data_{table_name}", dtype_backend='pyarrow')
+            if cached_data is not None:
+                return cached_data
             
             # Query from database
-            df = pd.read_sql_table(table_name, self.engine)
+            # Arrow-backed columns: strings stay out of Python objects, and the
+            # Feather cache below encodes them without conversion
+            with self._connection(conn) as c:
+                df = pd.read_sql_table(table_name, c, dtype_backend='pyarrow')
             
             # Cache the result
-            self.cache_set(f"data_{table_name}", df.to_dict('records'))
+            self.cache_set_df(f"data_{table_name}", df)
             
             return df
             
@@ -188,33 +608,46 @@ class DatabaseManager:
             logger.error(f"Error retrieving data: {e}")
             return None
     
-    def execute_sql_query(self, query: str, department: str) -> Optional[pd.DataFrame]:
+    def execute_sql_query(self, query: str, department: str, conn=None) -> Optional[pd.DataFrame]:
         """Execute a SQL query on police data."""
+        import pandas as pd
+        
         try:
             table_name = self._get_table_name(department)
-            logger.info(f"Executing query for department '{department}' using table '{table_name}'")
             
             # Smart table name replacement - only replace standalone 'police_data' not 'police_data_xxx'
-            query = re.sub(r'\bpolice_data\b(?!_)', table_name, query)
-            logger.info(f"Query after table replacement: {query[:100]}...")
+            query = _TABLE_PLACEHOLDER_RE.sub(table_name, query)
+            
+            # Cache keys for the query; the table version retires both the shared and the
+            # in-process entries as soon as store_police_data replaces the table
+            version = table_version(table_name)
+            cache_key = f"query_{_hash_key(f'{query}|{version}')}"
+            local_key = _hash_key(f"{query}|{table_name}|{version}")
+            cached_result = _query_cache_get(local_key)
+            if cached_result is not None:
+                logger.debug("query cache hit table=%s", table_name)
+                return cached_result
             
-            # Cache key for the query
-            cache_key = f"query_{hashlib.md5(query.encode()).hexdigest()}"
-            cached_result = self.cache_get(cache_key)
-            if cached_result:
-                logger.info("Returning cached query result")
-                return pd.DataFrame(cached_result)
+            cached_result = self.cache_get_df(cache_key)
+            if cached_result is not None:
+                logger.debug("query cache hit table=%s", table_name)
+                _query_cache_put(local_key, table_name, cached_result)
+                return cached_result.copy(deep=False)
             
             # Execute query
-            with self.engine.connect() as conn:
-                result = pd.read_sql_query(text(query), conn)
+            with self._connection(conn) as c:
+                result = pd.read_sql_query(_compile_text(query), c)
             
-            logger.info(f"Query executed successfully, returned {len(result)} rows")
+            # One line per executed query; %-style args are only formatted if a handler
+            # emits it, and %.100s truncates the query without slicing it first
+            logger.info("query dept=%s table=%s rows=%d preview=%.100s",
+                        department, table_name, len(result), query)
             
             # Cache the result
-            self.cache_set(cache_key, result.to_dict('records'))
+            self.cache_set_df(cache_key, result)
+            _query_cache_put(local_key, table_name, result)
             
-            return result
+            return result.copy(deep=False)
             
         except SQLAlchemyError as e:
             logger.error(f"SQL execution error for department '{department}': {e}")
@@ -225,51 +658,64 @@ class DatabaseManager:
             logger.error(f"Failed query: {query}")
             return None
     
-    def get_table_schema(self, department: str) -> Optional[Dict]:
+    def get_table_schema(self, department: str, conn=None) -> Optional[Dict]:
         """Get the schema of the police data table."""
         try:
             table_name = self._get_table_name(department)
             
-            # Check cache first
+            # Schemas only change in store_police_data, so the in-process copy is
+            # checked before Redis
+            if table_name in _schema_cache:
+                return _schema_cache[table_name]
+            
             cache_key = f"schema_{table_name}"
             cached_schema = self.cache_get(cache_key)
             if cached_schema:
+                _schema_cache[table_name] = cached_schema
                 return cached_schema
             
             # Get schema from database
-            with self.engine.connect() as conn:
-                result = conn.execute(text(f"PRAGMA table_info({table_name})"))
-                columns = result.fetchall()
+            with self._connection(conn) as c:
+                # PRAGMA can't take bound parameters, so quote the name instead
+                # Rows come back as RowMappings, read by column name in one pass;
+                # .all() drains the cursor before the cache writes below
+                rows = c.execute(
+                    _compile_text(f"PRAGMA table_info({self._quote(table_name)})")
+                ).mappings().all()
                 
                 schema = {
                     'table_name': table_name,
                     'columns': [
                         {
-                            'name': col[1],
-                            'type': col[2],
-                            'nullable': not col[3],
-                            'primary_key': bool(col[5])
+                            'name': col['name'],
+                            'type': col['type'],
+                            'nullable': not col['notnull'],
+                            'primary_key': bool(col['pk'])
                         }
-                        for col in columns
+                        for col in rows
                     ]
                 }
                 
                 # Cache the schema
                 self.cache_set(cache_key, schema)
+                _schema_cache[table_name] = schema
                 return schema
                 
         except Exception as e:
             logger.error(f"Error getting table schema: {e}")
             return None
     
-    def get_sample_data(self, department: str, limit: int = 5) -> Optional[pd.DataFrame]:
+    def get_sample_data(self, department: str, limit: int = 5, conn=None) -> Optional[pd.DataFrame]:
         """Get sample data for preview."""
+        import pandas as pd
+        
         try:
             table_name = self._get_table_name(department)
             
-            with self.engine.connect() as conn:
-                query = text(f"SELECT * FROM {table_name} LIMIT {limit}")
-                result = pd.read_sql_query(query, conn)
+            with self._connection(conn) as c:
+                # Same statement text for every limit, so the compiled clause is reused
+                query = _compile_text(f"SELECT * FROM {self._quote(table_name)} LIMIT :limit")
+                result = pd.read_sql_query(query, c, params={'limit': int(limit)})
                 
             return result
             
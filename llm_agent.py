@@ -2,23 +2,336 @@ import time
 import json
 import sqlite3
 import re
+import threading
+import functools
+import numbers
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, Optional, Tuple, Any
 import logging
 from groq import Groq
+import numpy as np
 import pandas as pd
-from config import GROQ_API_KEY, GROQ_MODEL, MAX_LLM_RESPONSE_TIME
-from database import DatabaseManager
+from sqlalchemy.engine import make_url
+from config import DATABASE_URL, GROQ_API_KEY, GROQ_MODEL, MAX_LLM_RESPONSE_TIME, CACHE_EXPIRY
+from database import DatabaseManager, table_version
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional - fall back to numpy reductions
+    njit = None
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional - fall back to the regex scan
+    ahocorasick = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Question intents for the canned queries in generate_sql_query, in priority order. Each
+# alternative is a zero-width lookahead tested at position 0, so re.match tries them in
+# order and the first one that applies wins; match.lastgroup names the intent
+_INTENT_RE = re.compile(
+    r'(?P<total_stops>(?=.*(?:total number of stops|how many stops)))'
+    r'|(?P<arrests_for_race>(?=.*arrest)(?=.*(?:black|white|hispanic|asian)))'
+    r'|(?P<arrest_rate_difference>(?=.*arrest)(?=.*rate)(?=.*difference))'
+    r'|(?P<peak_hour>(?=.*hour))'
+    r'|(?P<by_race>(?=.*race))'
+    r'|(?P<by_district>(?=.*district))',
+    re.DOTALL
+)
+
+_RACES = ('black', 'white', 'hispanic', 'asian')
+
+# Keywords the query and explanation branches test for. Matched as substrings, like the
+# original `in` checks ('arrest' also hits 'arrested'), but collected in one scan
+_KEYWORDS = ('arrest', 'black', 'white', 'hispanic', 'asian', 'search rate', 'searched')
+
+@functools.lru_cache(maxsize=1024)
+def _classify_intent(question_lower: str) -> Tuple[Optional[str], Optional[str]]:
+    """Map a lowercased question to (intent, race) for _render_sql, or (None, None)."""
+    intent_match = _INTENT_RE.match(question_lower)
+    if intent_match is None:
+        return None, None
+    intent = intent_match.lastgroup
+    hits = _keyword_hits(question_lower)
+    if intent == 'arrests_for_race':
+        return intent, next((r for r in _RACES if r in hits), None)
+    if intent == 'by_race':
+        return ('arrests_by_race' if 'arrest' in hits else 'stops_by_race'), None
+    return intent, None
+
+# Canned SQL bodies, filled in with str.format_map by _render_sql
+_SQL_TEMPLATES = {
+    'total_stops': "SELECT COUNT(*) as total_stops FROM {table}",
+    'arrests_for_race': """
+        SELECT COUNT(*) as arrest_count 
+        FROM {table} 
+        WHERE LOWER({race_col}) = '{race}' AND arrest_made = 1
+        """,
+    'arrests_for_race_by_outcome': """
+        SELECT COUNT(*) as arrest_count 
+        FROM {table} 
+        WHERE LOWER({race_col}) = '{race}' AND LOWER(stop_outcome) LIKE '%arrest%'
+        """,
+    'stops_for_race': """
+        SELECT COUNT(*) as stops_count 
+        FROM {table} 
+        WHERE LOWER({race_col}) = '{race}'
+        """,
+    'arrest_rate_difference': """
+        SELECT 
+            {race_col} as race,
+            COUNT(*) as total_stops,
+            SUM(CASE WHEN arrest_made = 1 THEN 1 ELSE 0 END) as arrests,
+            ROUND((SUM(CASE WHEN arrest_made = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*)), 2) as arrest_rate
+        FROM {table} 
+        WHERE {race_col} IS NOT NULL AND LOWER({race_col}) IN ('black', 'white')
+        GROUP BY {race_col}
+        ORDER BY arrest_rate DESC
+        """,
+    'arrest_rate_difference_by_outcome': """
+        SELECT 
+            {race_col} as race,
+            COUNT(*) as total_stops,
+            SUM(CASE WHEN LOWER(stop_outcome) LIKE '%arrest%' THEN 1 ELSE 0 END) as arrests,
+            ROUND((SUM(CASE WHEN LOWER(stop_outcome) LIKE '%arrest%' THEN 1 ELSE 0 END) * 100.0 / COUNT(*)), 2) as arrest_rate
+        FROM {table} 
+        WHERE {race_col} IS NOT NULL AND LOWER({race_col}) IN ('black', 'white')
+        GROUP BY {race_col}
+        ORDER BY arrest_rate DESC
+        """,
+    'peak_hour': """
+        SELECT CAST(substr(time, 1, 2) AS INTEGER) as hour, 
+               COUNT(*) as stops 
+        FROM {table} 
+        WHERE time IS NOT NULL AND length(time) >= 2
+        GROUP BY CAST(substr(time, 1, 2) AS INTEGER) 
+        ORDER BY stops DESC 
+        LIMIT 1
+        """,
+    'arrests_by_race': """
+        SELECT {race_col} as race, 
+               COUNT(*) as total_stops,
+               SUM(CASE WHEN arrest_made = 1 THEN 1 ELSE 0 END) as total_arrests
+        FROM {table} 
+        WHERE {race_col} IS NOT NULL 
+        GROUP BY {race_col} 
+        ORDER BY total_arrests DESC
+        """,
+    'stops_by_race': """
+        SELECT {race_col} as race, COUNT(*) as stops 
+        FROM {table} 
+        WHERE {race_col} IS NOT NULL 
+        GROUP BY {race_col} 
+        ORDER BY stops DESC
+        """,
+    'by_district': """
+        SELECT {district_col} as district, COUNT(*) as stops 
+        FROM {table} 
+        WHERE {district_col} IS NOT NULL 
+        GROUP BY {district_col} 
+        ORDER BY stops DESC
+        """,
+    'no_race_data': "SELECT 'Race data not available in this dataset' as message, 0 as count",
+    'no_arrest_or_race_data': "SELECT 'Arrest or race data not available in this dataset' as message, 0 as count",
+    'no_time_data': "SELECT 'Time data not available in this dataset' as message, 0 as count",
+    'no_district_data': "SELECT 'District data not available in this dataset' as message, 0 as count",
+}
+
+def _first_present(candidates: Tuple[str, ...], columns: Tuple[str, ...]) -> Optional[str]:
+    return next((col for col in candidates if col in columns), None)
+
+def _template_for(intent: str, columns: Tuple[str, ...], race_col: Optional[str],
+                  district_col: Optional[str], race: Optional[str]) -> str:
+    """Pick the _SQL_TEMPLATES key for an intent given which columns the table has."""
+    if intent == 'total_stops':
+        return 'total_stops'
+    if intent == 'arrests_for_race':
+        if not (race and race_col):
+            return 'no_race_data'
+        if 'arrest_made' in columns:
+            return 'arrests_for_race'
+        # Fallback without arrest_made: outcome text, else just count by race
+        return 'arrests_for_race_by_outcome' if 'stop_outcome' in columns else 'stops_for_race'
+    if intent == 'arrest_rate_difference':
+        if race_col and 'arrest_made' in columns:
+            return 'arrest_rate_difference'
+        if race_col and 'stop_outcome' in columns:
+            return 'arrest_rate_difference_by_outcome'
+        return 'no_arrest_or_race_data'
+    if intent == 'peak_hour':
+        return 'peak_hour' if 'time' in columns else 'no_time_data'
+    if intent in ('arrests_by_race', 'stops_by_race'):
+        if not race_col:
+            return 'no_race_data'
+        return 'arrests_by_race' if intent == 'arrests_by_race' and 'arrest_made' in columns else 'stops_by_race'
+    if intent == 'by_district':
+        return 'by_district' if district_col else 'no_district_data'
+    raise ValueError(f"Unknown intent: {intent}")
+
+@functools.lru_cache(maxsize=256)
+def _render_sql(intent: str, table_name: str, columns: Tuple[str, ...], race: Optional[str] = None) -> str:
+    """Build the canned SQL for an intent against a table with the given columns."""
+    race_col = _first_present(('driver_race', 'subject_race', 'race', 'ethnicity'), columns)
+    district_col = _first_present(('district', 'police_district', 'precinct', 'beat', 'sector'), columns)
+    template = _SQL_TEMPLATES[_template_for(intent, columns, race_col, district_col, race)]
+    return template.format_map({
+        'table': table_name,
+        'race_col': race_col,
+        'district_col': district_col,
+        'race': race
+    })
+
+# LLM output cleanup for _clean_sql_response
+_THINK_RE = re.compile(r'<think>.*?(?:</think>|\Z)', re.DOTALL)
+_CODE_FENCE_RE = re.compile(r'\A```(?:sql)?|```\Z', re.IGNORECASE)
+_HOUR_RE = re.compile(r'HOUR\(\s*time\s*\)', re.IGNORECASE)
+
+# A SELECT ... FROM statement up to its first terminator (';' or a closing code fence)
+_COMPLETE_SQL_RE = re.compile(r'\bSELECT\b.*?\bFROM\b.*?(?:;|```)', re.DOTALL | re.IGNORECASE)
+
+def _sql_complete(text: str) -> bool:
+    """Whether streamed model output already contains a complete SQL statement.
+    
+    Anything inside a <think> block is ignored, and an unclosed one means the answer
+    hasn't started yet.
+    """
+    think_start = text.find('<think>')
+    if think_start != -1:
+        think_end = text.find('</think>', think_start)
+        if think_end == -1:
+            return False
+        text = text[think_end + 8:]
+    match = _COMPLETE_SQL_RE.search(text)
+    return match is not None and match.group(0).count('(') == match.group(0).count(')')
+
+if ahocorasick is not None:
+    # Aho-Corasick automaton: one pass reports every keyword, overlapping ones included
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in _KEYWORDS:
+        _KEYWORD_AUTOMATON.add_word(_keyword, _keyword)
+    _KEYWORD_AUTOMATON.make_automaton()
+    
+    def _keyword_hits(question_lower: str) -> frozenset:
+        """Return the set of keywords occurring in an already-lowercased question."""
+        return frozenset(keyword for _, keyword in _KEYWORD_AUTOMATON.iter(question_lower))
+else:
+    _KEYWORD_RE = re.compile('|'.join(map(re.escape, _KEYWORDS)))
+    
+    def _keyword_hits(question_lower: str) -> frozenset:
+        """Return the set of keywords occurring in an already-lowercased question."""
+        return frozenset(_KEYWORD_RE.findall(question_lower))
+
+# Answers from execute_query_and_explain, keyed by (department, table version, normalized question):
+# key -> (expires_at, result). A repeated question skips the LLM call and the query.
+# Module-level because the agent is recreated on every Streamlit rerun
+_ANSWER_CACHE_MAX = 256
+_answer_cache: "OrderedDict[Tuple[str, int, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_answer_cache_lock = threading.Lock()  # shared by every Streamlit session thread
+_NON_WORD_RE = re.compile(r'\W+')
+
+# Schema probes and the system prompts built from them: table_name -> (table_version, value).
+# The schema only changes when the table is re-stored, which bumps its version
+_table_info_cache: Dict[str, Tuple[int, Dict]] = {}
+_system_prompt_cache: Dict[str, Tuple[int, str]] = {}
+
+if njit is not None:
+    @njit(cache=True)
+    def _summarize_counts(counts):
+        """Return (total, index of the max, max) of a non-empty int64/float64 array in one
+        pass, skipping NaN like nansum/nanargmax. The index is -1 if every value is NaN."""
+        total = 0
+        max_idx = -1
+        for i in range(counts.size):
+            value = counts[i]
+            if value != value:  # NaN
+                continue
+            total += value
+            if max_idx < 0 or value > counts[max_idx]:
+                max_idx = i
+        return total, max_idx, counts[max_idx]
+else:
+    def _summarize_counts(counts):
+        """Return (total, index of the max, max) of a non-empty int64/float64 array, skipping
+        NaN. The index is -1 if every value is NaN."""
+        total = np.nansum(counts).item()
+        if counts.dtype.kind == 'f' and np.isnan(counts).all():
+            return total, -1, float('nan')
+        max_idx = int(np.nanargmax(counts))
+        return total, max_idx, counts[max_idx].item()
+
+# Static part of the SQL-generation system prompt. It comes first so every department's
+# prompt shares the same leading tokens, which Groq's prompt caching can reuse
+_SYSTEM_PROMPT_PREAMBLE = """You are a SQLite query generator. Generate ONLY valid SQLite SQL queries.
+
+**DATABASE: SQLite (NOT MySQL/PostgreSQL)**
+
+**SQLITE SYNTAX RULES:**
+1. Use SQLite functions: strftime(), substr(), CAST(), datetime()
+2. For hour extraction: CAST(substr(time, 1, 2) AS INTEGER) NOT HOUR()
+3. For dates: strftime('%Y-%m', date) NOT DATE_FORMAT()
+4. Always end with complete ORDER BY clause
+5. Use the exact table name given under TABLE INFO
+6. Use exact column names from the TABLE INFO list
+
+**CRITICAL:**
+- Return ONLY complete SQLite query
+- NO explanations, NO thinking, NO incomplete queries
+- Always include complete ORDER BY clause
+"""
+
+# Reasoning models emit a <think> block before the SQL, which needs the larger token budget
+# and can't take a ';' stop sequence (the reasoning may quote SQL)
+_REASONING_MODEL_RE = re.compile(r'deepseek-r1|qwq|reasoning', re.IGNORECASE)
+
+def _completion_limits(model: str) -> Dict[str, Any]:
+    """Decode limits for the SQL completion: SQL answers here stay well under 200 tokens,
+    and stopping at the first ';' skips anything the model adds after the statement."""
+    if _REASONING_MODEL_RE.search(model):
+        return {'max_tokens': 500}
+    return {'max_tokens': 200, 'stop': [';']}
+
+@functools.lru_cache(maxsize=8)
+def _groq_client(api_key: str) -> Groq:
+    """One client (and HTTP connection pool) per API key, reused across reruns."""
+    return Groq(api_key=api_key)
+
+# One long-lived read-only connection for schema probes, instead of a connect/close per
+# probe. The lock serializes use across Streamlit's script threads
+_read_conn: Optional[sqlite3.Connection] = None
+_read_lock = threading.Lock()
+
+def _read_connection() -> sqlite3.Connection:
+    """Return the shared read-only connection to the app database; call with _read_lock held."""
+    global _read_conn
+    if _read_conn is None:
+        path = make_url(DATABASE_URL).database
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA cache_size=-65536")
+        _read_conn = conn
+    return _read_conn
+
+# Opens the Groq connection (TCP + TLS) while a schema probe runs on the request thread
+_warmup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-warmup")
+
+# Longest the SQL request waits for an unfinished warm-up before going ahead on its own
+WARMUP_WAIT_SECONDS = 0.5
+
+def _normalize_question(question: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so trivially different phrasings share a key."""
+    return _NON_WORD_RE.sub(' ', question.lower()).strip()
+
 class PoliceDataLLMAgent:
     def __init__(self, api_key: Optional[str] = None):
         # Use provided API key or fall back to config
         self.api_key = api_key or GROQ_API_KEY
         
         if self.api_key:
-            self.client = Groq(api_key=self.api_key)
+            self.client = _groq_client(self.api_key)
             self.llm_available = True
         else:
             self.client = None
@@ -28,81 +341,139 @@ class PoliceDataLLMAgent:
         self.db_manager = DatabaseManager()
     
     def get_table_info(self, department: str) -> Dict:
-        """Get actual table schema and sample data for a department."""
+        """Get actual table schema and sample data for a department (cached per table version)."""
         try:
             # Get table name
             table_name = self.db_manager._get_table_name(department)
+            version = table_version(table_name)
+            cached = _table_info_cache.get(table_name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            
+            # A probe persisted by an earlier process saves the DISTINCT scans
+            probe = self.db_manager.load_table_probe(table_name)
+            if probe is not None:
+                table_info = self._table_info_from_probe(table_name, probe)
+                _table_info_cache[table_name] = (version, table_info)
+                return table_info
+            
             logger.info(f"Getting table info for department '{department}' -> table '{table_name}'")
             
             # Use direct database connection to avoid replacement issues
-            conn = sqlite3.connect('police_data.db')
-            logger.info(f"SQLite connection established")
-            
-            # Get sample data directly
-            query = f"SELECT * FROM {table_name} LIMIT 5"
-            logger.info(f"Executing query: {query}")
-            sample_df = pd.read_sql_query(query, conn)
-            logger.info(f"Sample data retrieved: {len(sample_df)} rows, {len(sample_df.columns)} columns")
+            with _read_lock:
+                table_info = self._probe_table(_read_connection(), table_name)
             
-            if sample_df is None or sample_df.empty:
-                logger.error("Sample data is empty or None")
-                conn.close()
+            if table_info is None:
                 return None
-                
-            # Get column info
-            columns = list(sample_df.columns)
-            logger.info(f"Columns: {columns[:10]}...")  # Show first 10 columns
-            
-            # Get distinct values for categorical columns
-            categorical_info = {}
-            
-            # Check race column
-            race_col = None
-            for col in ['driver_race', 'subject_race', 'race']:
-                if col in columns:
-                    race_col = col
-                    break
-            
-            if race_col:
-                race_query = f"SELECT DISTINCT {race_col} FROM {table_name} WHERE {race_col} IS NOT NULL LIMIT 10"
-                logger.info(f"Getting race values: {race_query}")
-                race_values_df = pd.read_sql_query(race_query, conn)
-                categorical_info['race_values'] = race_values_df[race_col].tolist()
-                logger.info(f"Race values: {categorical_info['race_values']}")
-            
-            # Check stop outcome column
-            outcome_col = None
-            for col in ['stop_outcome', 'disposition', 'outcome']:
-                if col in columns:
-                    outcome_col = col
-                    break
-                    
-            if outcome_col:
-                outcome_query = f"SELECT DISTINCT {outcome_col} FROM {table_name} WHERE {outcome_col} IS NOT NULL LIMIT 10"
-                logger.info(f"Getting outcome values: {outcome_query}")
-                outcome_values_df = pd.read_sql_query(outcome_query, conn)
-                categorical_info['outcome_values'] = outcome_values_df[outcome_col].tolist()
-                logger.info(f"Outcome values: {categorical_info['outcome_values']}")
             
-            conn.close()
             logger.info("Table info retrieved successfully")
+            categorical_info = table_info['categorical_info']
+            self.db_manager.save_table_probe(
+                table_name, table_info['columns'], table_info['sample_data'],
+                race_values=categorical_info.get('race_values'),
+                outcome_values=categorical_info.get('outcome_values')
+            )
+            _table_info_cache[table_name] = (version, table_info)
+            return table_info
             
-            return {
-                'table_name': table_name,
-                'columns': columns,
-                'sample_data': sample_df.head(3).to_dict('records'),
-                'categorical_info': categorical_info,
-                'total_rows': len(sample_df)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error getting table info for '{department}': {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+        except Exception:
+            # logger.exception formats the traceback only if the record is emitted
+            logger.exception("Error getting table info for '%s'", department)
+            return None
+    
+    def refresh_schema(self, department: str) -> Optional[Dict]:
+        """Discard cached table info for a department (persisted and in-process) and re-probe."""
+        table_name = self.db_manager._get_table_name(department)
+        self.db_manager.delete_table_probe(table_name)
+        _table_info_cache.pop(table_name, None)
+        _system_prompt_cache.pop(table_name, None)
+        return self.get_table_info(department)
+    
+    @staticmethod
+    def _table_info_from_probe(table_name: str, probe: Dict) -> Dict:
+        """Rebuild get_table_info's result from a persisted probe."""
+        categorical_info = {}
+        if probe['race_values'] is not None:
+            categorical_info['race_values'] = probe['race_values']
+        if probe['outcome_values'] is not None:
+            categorical_info['outcome_values'] = probe['outcome_values']
+        return {
+            'table_name': table_name,
+            'columns': probe['columns'],
+            'sample_data': probe['sample_data'][:3],
+            'categorical_info': categorical_info,
+            'total_rows': len(probe['sample_data'])
+        }
+    
+    def _probe_table(self, conn: sqlite3.Connection, table_name: str) -> Optional[Dict]:
+        """Read column names, sample rows and categorical values for a table."""
+        # conn yields sqlite3.Row: name-keyed rows straight from the cursor, no DataFrame needed
+        query = f"SELECT * FROM {table_name} LIMIT 5"
+        logger.info(f"Executing query: {query}")
+        sample_rows = conn.execute(query).fetchall()
+        
+        if not sample_rows:
+            logger.error("Sample data is empty or None")
             return None
+        
+        columns = list(sample_rows[0].keys())
+        logger.info(f"Sample data retrieved: {len(sample_rows)} rows, {len(columns)} columns")
+        logger.info(f"Columns: {columns[:10]}...")  # Show first 10 columns
+        
+        # Check race and stop outcome columns
+        race_col = None
+        for col in ['driver_race', 'subject_race', 'race']:
+            if col in columns:
+                race_col = col
+                break
+        
+        outcome_col = None
+        for col in ['stop_outcome', 'disposition', 'outcome']:
+            if col in columns:
+                outcome_col = col
+                break
+        
+        # Get distinct values for both categorical columns in one statement, tagging each
+        # row with the key it belongs to (LIMIT needs a subquery inside a UNION member)
+        probes = [(key, col) for key, col in (('race_values', race_col), ('outcome_values', outcome_col)) if col]
+        categorical_info = {key: [] for key, _ in probes}
+        if probes:
+            distinct_query = " UNION ALL ".join(
+                f"SELECT '{key}', value FROM (SELECT DISTINCT {col} AS value FROM {table_name} "
+                f"WHERE {col} IS NOT NULL LIMIT 10)"
+                for key, col in probes
+            )
+            logger.info(f"Getting categorical values: {distinct_query}")
+            for key, value in conn.execute(distinct_query):
+                categorical_info[key].append(value)
+            logger.info(f"Categorical values: {categorical_info}")
+        
+        return {
+            'table_name': table_name,
+            'columns': columns,
+            'sample_data': [dict(row) for row in sample_rows[:3]],
+            'categorical_info': categorical_info,
+            'total_rows': len(sample_rows)
+        }
 
+    def _get_system_prompt(self, table_info: Dict) -> str:
+        """Return the system prompt for a table, built once per table version so the
+        prompt text is identical across calls."""
+        table_name = table_info['table_name']
+        version = table_version(table_name)
+        cached = _system_prompt_cache.get(table_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        system_prompt = self._create_dynamic_system_prompt(table_info)
+        _system_prompt_cache[table_name] = (version, system_prompt)
+        return system_prompt
+    
     def _create_dynamic_system_prompt(self, table_info: Dict) -> str:
-        """Create a system prompt with real table information."""
+        """Create a system prompt with real table information.
+        
+        The output depends only on table_info, with categorical values sorted, so the
+        same table always produces byte-identical text after the shared preamble.
+        """
         
         columns_list = ", ".join(table_info['columns'])
         
@@ -115,13 +486,10 @@ class PoliceDataLLMAgent:
             sample_data_str += f"Row {i+1}: {', '.join(row_details[:8])}...\n"
         
         categorical_info_str = ""
-        for key, values in table_info['categorical_info'].items():
-            categorical_info_str += f"- {key}: {values}\n"
+        for key, values in sorted(table_info['categorical_info'].items()):
+            categorical_info_str += f"- {key}: {sorted(values, key=str)}\n"
         
-        return f"""You are a SQLite query generator. Generate ONLY valid SQLite SQL queries.
-
-**DATABASE: SQLite (NOT MySQL/PostgreSQL)**
-
+        return _SYSTEM_PROMPT_PREAMBLE + f"""
 **TABLE INFO:**
 Table: {table_info['table_name']}
 Columns: {columns_list}
@@ -132,27 +500,21 @@ Columns: {columns_list}
 **CATEGORICAL VALUES:**
 {categorical_info_str}
 
-**SQLITE SYNTAX RULES:**
-1. Use SQLite functions: strftime(), substr(), CAST(), datetime()
-2. For hour extraction: CAST(substr(time, 1, 2) AS INTEGER) NOT HOUR()
-3. For dates: strftime('%Y-%m', date) NOT DATE_FORMAT()
-4. Always end with complete ORDER BY clause
-5. Use exact table name: {table_info['table_name']}
-6. Use exact column names from above list
-
 **REQUIRED EXAMPLES:**
 - Time analysis: "SELECT CAST(substr(time, 1, 2) AS INTEGER) as hour, COUNT(*) as stop_count FROM {table_info['table_name']} WHERE time IS NOT NULL GROUP BY hour ORDER BY stop_count DESC"
 - Race analysis: "SELECT driver_race, COUNT(*) as count FROM {table_info['table_name']} WHERE driver_race IS NOT NULL GROUP BY driver_race ORDER BY count DESC"
-- Monthly: "SELECT strftime('%Y-%m', date) as month, COUNT(*) as stops FROM {table_info['table_name']} WHERE date IS NOT NULL GROUP BY month ORDER BY month"
-
-**CRITICAL:**
-- Return ONLY complete SQLite query
-- NO explanations, NO thinking, NO incomplete queries
-- Always include complete ORDER BY clause"""
+- Monthly: "SELECT strftime('%Y-%m', date) as month, COUNT(*) as stops FROM {table_info['table_name']} WHERE date IS NOT NULL GROUP BY month ORDER BY month"""
 
     def generate_sql_query(self, question: str, department: str) -> Tuple[Optional[str], float]:
         """Generate SQL query from natural language question using real schema."""
+        sql_query, generation_time, _ = self._generate_sql(question, department)
+        return sql_query, generation_time
+    
+    def _generate_sql(self, question: str, department: str) -> Tuple[Optional[str], float, bool]:
+        """generate_sql_query, also reporting whether the SQL is a generic fallback count
+        (no API key, no schema, or a failed LLM call) rather than an answer to the question."""
         start_time = time.time()
+        fallback = False
         
         try:
             # Get table name directly
@@ -162,230 +524,146 @@ Columns: {columns_list}
             # Simple direct query generation based on question patterns
             question_lower = question.lower()
             
+            # Canned queries for recognised intents; anything else goes to the LLM
+            intent, race = _classify_intent(question_lower)
+            
+            # Headed for the LLM with a schema probe to run first: connect to Groq in the
+            # background meanwhile instead of after the probe
+            warmup = None
+            if intent is None and self.llm_available:
+                cached = _table_info_cache.get(table_name)
+                if cached is None or cached[0] != table_version(table_name):
+                    warmup = _warmup_pool.submit(self._warm_http_conn)
+            
             # Get table info for schema awareness
             table_info = self.get_table_info(department)
             available_columns = table_info.get('columns', []) if table_info else []
             
-            # Find appropriate race column
-            race_columns = ['driver_race', 'subject_race', 'race', 'ethnicity']
-            race_col = None
-            for col in race_columns:
-                if col in available_columns:
-                    race_col = col
-                    break
-            
-            # Find appropriate outcome columns
-            outcome_columns = ['stop_outcome', 'arrest_made', 'citation_issued', 'warning_issued']
-            outcome_cols = [col for col in outcome_columns if col in available_columns]
-            
-            # Basic pattern matching for common queries with better logic
-            if 'total number of stops' in question_lower or 'how many stops' in question_lower:
-                sql_query = f"SELECT COUNT(*) as total_stops FROM {table_name}"
-                
-            elif 'arrest' in question_lower and any(race in question_lower for race in ['black', 'white', 'hispanic', 'asian']):
-                # Handle race-specific arrest queries
-                race = None
-                if 'black' in question_lower:
-                    race = 'black'
-                elif 'white' in question_lower:
-                    race = 'white'
-                elif 'hispanic' in question_lower:
-                    race = 'hispanic'
-                elif 'asian' in question_lower:
-                    race = 'asian'
-                
-                if race and race_col:
-                    if 'arrest_made' in available_columns:
-                        sql_query = f"""
-                        SELECT COUNT(*) as arrest_count 
-                        FROM {table_name} 
-                        WHERE LOWER({race_col}) = '{race}' AND arrest_made = 1
-                        """
-                    elif 'stop_outcome' in available_columns:
-                        sql_query = f"""
-                        SELECT COUNT(*) as arrest_count 
-                        FROM {table_name} 
-                        WHERE LOWER({race_col}) = '{race}' AND LOWER(stop_outcome) LIKE '%arrest%'
-                        """
-                    else:
-                        # Fallback: just count by race
-                        sql_query = f"""
-                        SELECT COUNT(*) as stops_count 
-                        FROM {table_name} 
-                        WHERE LOWER({race_col}) = '{race}'
-                        """
-                else:
-                    # No race column available
-                    sql_query = f"SELECT 'Race data not available in this dataset' as message, 0 as count"
-                    
-            elif 'arrest' in question_lower and 'rate' in question_lower and 'difference' in question_lower:
-                # Handle comparative arrest rate queries
-                if race_col and 'arrest_made' in available_columns:
-                    sql_query = f"""
-                    SELECT 
-                        {race_col} as race,
-                        COUNT(*) as total_stops,
-                        SUM(CASE WHEN arrest_made = 1 THEN 1 ELSE 0 END) as arrests,
-                        ROUND((SUM(CASE WHEN arrest_made = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*)), 2) as arrest_rate
-                    FROM {table_name} 
-                    WHERE {race_col} IS NOT NULL AND LOWER({race_col}) IN ('black', 'white')
-                    GROUP BY {race_col}
-                    ORDER BY arrest_rate DESC
-                    """
-                elif race_col and 'stop_outcome' in available_columns:
-                    sql_query = f"""
-                    SELECT 
-                        {race_col} as race,
-                        COUNT(*) as total_stops,
-                        SUM(CASE WHEN LOWER(stop_outcome) LIKE '%arrest%' THEN 1 ELSE 0 END) as arrests,
-                        ROUND((SUM(CASE WHEN LOWER(stop_outcome) LIKE '%arrest%' THEN 1 ELSE 0 END) * 100.0 / COUNT(*)), 2) as arrest_rate
-                    FROM {table_name} 
-                    WHERE {race_col} IS NOT NULL AND LOWER({race_col}) IN ('black', 'white')
-                    GROUP BY {race_col}
-                    ORDER BY arrest_rate DESC
-                    """
-                else:
-                    sql_query = f"SELECT 'Arrest or race data not available in this dataset' as message, 0 as count"
-                    
-            elif 'peak hour' in question_lower or 'hour' in question_lower:
-                # Handle hourly analysis
-                if 'time' in available_columns:
-                    sql_query = f"""
-                    SELECT CAST(substr(time, 1, 2) AS INTEGER) as hour, 
-                           COUNT(*) as stops 
-                    FROM {table_name} 
-                    WHERE time IS NOT NULL AND length(time) >= 2
-                    GROUP BY CAST(substr(time, 1, 2) AS INTEGER) 
-                    ORDER BY stops DESC 
-                    LIMIT 1
-                    """
-                else:
-                    sql_query = f"SELECT 'Time data not available in this dataset' as message, 0 as count"
-                    
-            elif 'by race' in question_lower or 'race' in question_lower:
-                # Handle race breakdowns
-                if race_col:
-                    if 'arrest' in question_lower and 'arrest_made' in available_columns:
-                        sql_query = f"""
-                        SELECT {race_col} as race, 
-                               COUNT(*) as total_stops,
-                               SUM(CASE WHEN arrest_made = 1 THEN 1 ELSE 0 END) as total_arrests
-                        FROM {table_name} 
-                        WHERE {race_col} IS NOT NULL 
-                        GROUP BY {race_col} 
-                        ORDER BY total_arrests DESC
-                        """
-                    else:
-                        sql_query = f"""
-                        SELECT {race_col} as race, COUNT(*) as stops 
-                        FROM {table_name} 
-                        WHERE {race_col} IS NOT NULL 
-                        GROUP BY {race_col} 
-                        ORDER BY stops DESC
-                        """
-                else:
-                    sql_query = f"SELECT 'Race data not available in this dataset' as message, 0 as count"
-                    
-            elif 'district' in question_lower:
-                # Handle district queries
-                district_columns = ['district', 'police_district', 'precinct', 'beat', 'sector']
-                district_col = None
-                for col in district_columns:
-                    if col in available_columns:
-                        district_col = col
-                        break
-                
-                if district_col:
-                    sql_query = f"""
-                    SELECT {district_col} as district, COUNT(*) as stops 
-                    FROM {table_name} 
-                    WHERE {district_col} IS NOT NULL 
-                    GROUP BY {district_col} 
-                    ORDER BY stops DESC
-                    """
-                else:
-                    sql_query = f"SELECT 'District data not available in this dataset' as message, 0 as count"
+            if intent is not None:
+                sql_query = _render_sql(intent, table_name, tuple(available_columns), race)
                 
             else:
                 # Check if LLM is available for complex queries
                 if not self.llm_available:
                     # Fallback to simple count query when no API key
                     sql_query = f"SELECT COUNT(*) as total_stops FROM {table_name}"
+                    fallback = True
                     logger.info("Using fallback query due to missing API key")
                 else:
                     # Try the complex method as fallback
                     if not table_info:
                         # Ultimate fallback - simple count query
                         sql_query = f"SELECT COUNT(*) as total_stops FROM {table_name}"
+                        fallback = True
                     else:
                         # Use the original complex method
-                        system_prompt = self._create_dynamic_system_prompt(table_info)
-                        
-                        response = self.client.chat.completions.create(
-                            model=GROQ_MODEL,
-                            messages=[
-                                {"role": "system", "content": system_prompt},
-                                {"role": "user", "content": f"Generate SQL for: {question}"}
-                            ],
-                            temperature=0.1,
-                            max_tokens=500
-                        )
+                        system_prompt = self._get_system_prompt(table_info)
+                        if warmup is not None:
+                            # Let the completion reuse the warmed connection, but never
+                            # wait out a slow warm-up call
+                            try:
+                                warmup.exception(timeout=WARMUP_WAIT_SECONDS)
+                            except FutureTimeoutError:
+                                pass
                         
-                        sql_query = self._clean_sql_response(response.choices[0].message.content)
+                        content = self._stream_sql_completion(system_prompt, question)
+                        sql_query = self._clean_sql_response(content)
             
             generation_time = time.time() - start_time
             logger.info(f"Generated SQL: {sql_query[:100]}...")
             
-            return sql_query, generation_time
+            return sql_query, generation_time, fallback
             
-        except Exception as e:
+        except Exception:
             generation_time = time.time() - start_time
-            logger.error(f"Error generating SQL query: {e}")
+            logger.exception("Error generating SQL query")
             # Return a safe fallback query
             table_name = self.db_manager._get_table_name(department)
-            return f"SELECT COUNT(*) as total_records FROM {table_name}", generation_time
+            return f"SELECT COUNT(*) as total_records FROM {table_name}", generation_time, True
+    
+    def _warm_http_conn(self):
+        """Make a cheap API call so the client's pool holds an open connection."""
+        try:
+            self.client.models.list()
+        except Exception as e:
+            logger.debug(f"Groq warmup failed: {e}")
+    
+    def _stream_sql_completion(self, system_prompt: str, question: str) -> str:
+        """Stream the model's answer and stop reading once it holds a complete statement,
+        instead of waiting for any trailing explanation tokens."""
+        stream = self.client.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Generate SQL for: {question}"}
+            ],
+            temperature=0.1,
+            stream=True,
+            **_completion_limits(GROQ_MODEL)
+        )
+        
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                # Only a terminator can complete the statement, so skip the check otherwise
+                if (';' in delta or '`' in delta) and _sql_complete(''.join(parts)):
+                    break
+        finally:
+            # Closing early drops the rest of the response and frees the connection
+            stream.close()
+        
+        return ''.join(parts)
     
     def _clean_sql_response(self, sql_query: str) -> str:
         """Clean and fix SQL response."""
-        # Remove thinking markers
-        if '<think>' in sql_query:
-            think_start = sql_query.find('<think>')
-            think_end = sql_query.find('</think>')
-            if think_start != -1 and think_end != -1:
-                sql_query = sql_query[:think_start] + sql_query[think_end + 8:]
-            elif think_start != -1:
-                sql_query = sql_query[:think_start]
+        # Remove thinking markers (an unclosed block runs to the end of the text)
+        sql_query = _THINK_RE.sub('', sql_query).strip()
         
-        # Remove code blocks
-        if sql_query.startswith('```sql'):
-            sql_query = sql_query[6:]
-        elif sql_query.startswith('```'):
-            sql_query = sql_query[3:]
-        if sql_query.endswith('```'):
-            sql_query = sql_query[:-3]
+        # Remove code blocks, then the statement terminator - before the ORDER BY fix
+        # below, which would otherwise append after the ';'
+        sql_query = _CODE_FENCE_RE.sub('', sql_query).strip().rstrip(';').rstrip()
         
         # Fix incomplete ORDER BY
-        if sql_query.upper().endswith(' ORDER'):
+        upper = sql_query.upper()
+        if upper.endswith(' ORDER'):
             sql_query = sql_query + ' BY COUNT(*) DESC'
-        elif 'GROUP BY' in sql_query.upper() and 'ORDER BY' not in sql_query.upper():
-            if 'COUNT(' in sql_query.upper():
-                sql_query = sql_query + ' ORDER BY COUNT(*) DESC'
+        elif 'GROUP BY' in upper and 'ORDER BY' not in upper and 'COUNT(' in upper:
+            sql_query = sql_query + ' ORDER BY COUNT(*) DESC'
         
         # Fix MySQL syntax to SQLite
-        sql_query = sql_query.replace('HOUR(time)', 'CAST(substr(time, 1, 2) AS INTEGER)')
-        
-        if sql_query.endswith(';'):
-            sql_query = sql_query[:-1]
+        sql_query = _HOUR_RE.sub('CAST(substr(time, 1, 2) AS INTEGER)', sql_query)
         
-        return sql_query.strip()
+        return sql_query
     
     def execute_query_and_explain(self, question: str, department: str) -> Dict[str, Any]:
         """Execute query and provide explanation of results."""
         start_time = time.time()
         
+        cache_key = (department, table_version(self.db_manager._get_table_name(department)),
+                     _normalize_question(question))
+        with _answer_cache_lock:
+            cached = _answer_cache.get(cache_key)
+            if cached is not None and cached[0] <= time.monotonic():
+                del _answer_cache[cache_key]
+                cached = None
+            if cached is not None:
+                _answer_cache.move_to_end(cache_key)
+        if cached is not None:
+            result = dict(cached[1])
+            result['results'] = result['results'].copy(deep=False)
+            result['latency'] = time.time() - start_time
+            result['within_threshold'] = True
+            return result
+        
         try:
             # Generate SQL query
-            sql_query, generation_time = self.generate_sql_query(question, department)
+            sql_query, generation_time, fallback = self._generate_sql(question, department)
             
             if not sql_query:
                 return {
@@ -410,7 +688,7 @@ Columns: {columns_list}
             
             total_latency = time.time() - start_time
             
-            return {
+            result = {
                 'success': True,
                 'sql_query': sql_query,
                 'results': result_df,
@@ -420,8 +698,19 @@ Columns: {columns_list}
                 'within_threshold': total_latency <= MAX_LLM_RESPONSE_TIME
             }
             
+            # Only real answers are cached: failures and generic fallback counts (no API key,
+            # Groq errors) are retried on the next ask
+            if not fallback:
+                with _answer_cache_lock:
+                    _answer_cache[cache_key] = (time.monotonic() + CACHE_EXPIRY, result)
+                    _answer_cache.move_to_end(cache_key)
+                    while len(_answer_cache) > _ANSWER_CACHE_MAX:
+                        _answer_cache.popitem(last=False)
+            
+            return dict(result, results=result_df.copy(deep=False))
+            
         except Exception as e:
-            logger.error(f"Error executing query: {e}")
+            logger.exception("Error executing query")
             return {
                 'success': False,
                 'error': str(e),
@@ -436,10 +725,10 @@ Columns: {columns_list}
             
             rows_count = len(result_df)
             columns = list(result_df.columns)
-            question_lower = question.lower()
+            hits = _keyword_hits(question.lower())
             
-            # Handle specific race questions for arrests
-            if any(race in question_lower for race in ['black', 'blacks']) and 'arrest' in question_lower:
+            # Handle specific race questions for arrests ('black' also covers 'blacks')
+            if 'black' in hits and 'arrest' in hits:
                 # Look for any race column
                 race_col = None
                 for col in ['driver_race', 'subject_race', 'race']:
@@ -448,8 +737,11 @@ Columns: {columns_list}
                         break
                 
                 if race_col:
-                    black_data = result_df[result_df[race_col].str.lower() == 'black']
-                    if not black_data.empty:
+                    # Positions of the 'black' rows, found on the raw array rather than
+                    # by slicing out a filtered DataFrame
+                    races = result_df[race_col].str.lower().to_numpy(dtype=object, na_value='')
+                    black_rows = np.flatnonzero(races == 'black')
+                    if len(black_rows):
                         # Get count from appropriate column
                         count_col = None
                         for col in ['total_arrests', 'count', 'arrest_count']:
@@ -458,25 +750,41 @@ Columns: {columns_list}
                                 break
                         
                         if count_col:
-                            count = black_data[count_col].iloc[0]
+                            count = result_df[count_col].to_numpy()[black_rows[0]].item()
                         else:
-                            count = len(black_data)
+                            count = len(black_rows)
                         
                         return f"According to the data, **{count:,}** Black individuals were arrested."
                     else:
                         return "No arrest data found for Black individuals in this dataset."
             
             # Handle search rate questions - check if search data exists
-            elif 'search rate' in question_lower or 'searched' in question_lower:
+            elif 'search rate' in hits or 'searched' in hits:
                 search_cols = [col for col in columns if 'search' in col.lower()]
                 if not search_cols:
                     return "⚠️ **Search data not available**: The current dataset doesn't include search-related information. Only stop outcomes like arrests, citations, and warnings are available."
             
+            # Single value (e.g. SELECT COUNT(*)): report it directly
+            if result_df.shape == (1, 1):
+                value = result_df.iat[0, 0]
+                label = str(columns[0]).replace('_', ' ').title()
+                if isinstance(value, numbers.Number):
+                    return f"{label}: **{value:,}**"
+                return f"{label}: {value}"
+            
             # Generic response for other queries
             if 'total_arrests' in columns:
-                total_arrests = result_df['total_arrests'].sum()
-                top_group = result_df.iloc[0][columns[0]] if len(columns) > 1 else 'N/A'
-                top_count = result_df.iloc[0]['total_arrests']
+                arrests = result_df['total_arrests'].to_numpy()
+                if arrests.dtype.kind in 'iuf':
+                    # Total and top group from the raw array in one pass; summed in 64 bits
+                    # so narrow integer columns can't overflow
+                    arrests = arrests.astype(np.float64 if arrests.dtype.kind == 'f' else np.int64, copy=False)
+                    total_arrests, top_idx, top_count = _summarize_counts(arrests)
+                    top_group = result_df.iat[top_idx, 0] if len(columns) > 1 and top_idx >= 0 else 'N/A'
+                else:
+                    total_arrests = result_df['total_arrests'].sum()
+                    top_group = result_df.iloc[0][columns[0]] if len(columns) > 1 else 'N/A'
+                    top_count = result_df.iloc[0]['total_arrests']
                 return f"Arrest analysis shows {total_arrests:,} total arrests across {rows_count} groups. {top_group} had the highest number of arrests ({top_count:,})."
             
             elif any('count' in col.lower() for col in columns):
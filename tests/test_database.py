@@ -0,0 +1,47 @@
+"""Tests for DatabaseManager.store_police_data."""
+
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sqlalchemy")
+
+import database
+from database import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A DatabaseManager on a throwaway SQLite file, using the in-memory cache only."""
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path / 'police_data.db'}")
+    # Keep the Redis circuit open so the test never talks to a real server
+    monkeypatch.setattr(database, "_redis_cooldown_until", math.inf)
+    return DatabaseManager()
+
+
+def test_store_police_data_leaves_callers_frame_unchanged(db):
+    df = pd.DataFrame({
+        "Stop Date": ["2015-01-01", "2015-01-02"],
+        "driver-race": ["White", "Black"],
+        "officer id#": [101, 102],
+        "lat/lng": [47.6, 47.7],
+    })
+    original = df.copy(deep=True)
+
+    table_name = db.store_police_data("Seattle", df, {"source": "test", "columns": list(df.columns)})
+
+    assert table_name is not None
+    pd.testing.assert_frame_equal(df, original)
+
+    # The stored table got the cleaned names, the caller's frame did not
+    schema = db.get_table_schema("Seattle")
+    assert [col["name"] for col in schema["columns"]] == ["Stop_Date", "driver_race", "officer_id", "latlng"]
+
+
+def test_store_police_data_with_duplicate_columns_leaves_callers_frame_unchanged(db):
+    df = pd.DataFrame([["2015-01-01", "White", "dup"]], columns=["stop_date", "driver_race", "stop_date"])
+    original = df.copy(deep=True)
+
+    assert db.store_police_data("Seattle", df, {"source": "test"}) is not None
+    pd.testing.assert_frame_equal(df, original)
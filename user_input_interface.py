@@ -7,40 +7,336 @@ Asks specific questions to gather user requirements for data from:
 """
 
 import streamlit as st
-from typing import Dict, List, Optional
-import requests
-from bs4 import BeautifulSoup
-import re
+from typing import Dict, List, NamedTuple, Optional, Union
+import itertools
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import STANFORD_DATA_URL, CATALOG_CACHE_PATH, CACHE_EXPIRY
+
+class CityInfo(NamedTuple):
+    """One Stanford catalog location."""
+    stops: Union[int, str]  # stop count, or "Available" when the table doesn't give one
+    time_range: str
+    url: str
+
+# Known available locations from Stanford (from the actual data table). Module-level so
+# Streamlit reruns don't rebuild it
+STANFORD_LOCATIONS = {
+    "Seattle, WA": CityInfo(
+        319959, "2006-01-01 to 2015-12-31",
+        "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_wa_seattle_2020_04_01.csv.zip"
+    ),
+    "Chicago, IL": CityInfo(
+        "Available", "TBD",
+        "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_il_chicago_2020_04_01.csv.zip"
+    ),
+    "New York, NY": CityInfo(
+        "Available", "TBD",
+        "https://stacks.stanford.edu/file/druid:rk9745n3214/rk9745n3214_ny_new_york_2020_04_01.csv.zip"
+    ),
+    "Los Angeles, CA": CityInfo(
+        "Available", "TBD",
+        "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_ca_los_angeles_2020_04_01.csv.zip"
+    )
+}
+
+# Department names offered when searching by department, derived from the catalog above
+KNOWN_DEPARTMENTS = tuple(sorted(f"{city.split(',')[0]} Police Department" for city in STANFORD_LOCATIONS))
+
+# Cap on the options handed to the department selectbox, however large the catalog grows
+MAX_DEPARTMENT_RESULTS = 50
+
+def _matching_departments(query: str) -> List[str]:
+    """Known departments containing query (case-insensitive), at most MAX_DEPARTMENT_RESULTS."""
+    query = query.strip().lower()
+    matches = (name for name in KNOWN_DEPARTMENTS if query in name.lower())
+    return list(itertools.islice(matches, MAX_DEPARTMENT_RESULTS))
+
+def _location_from_filename(href: str) -> Optional[str]:
+    """'.../yg821jf8611_wa_seattle_2020_04_01.csv.zip' -> 'Seattle, WA' (None if not that shape)."""
+    parts = href.rsplit('/', 1)[-1][:-len('.csv.zip')].split('_')
+    # druid, state, city words..., yyyy, mm, dd
+    if len(parts) < 6 or not all(p.isdigit() for p in parts[-3:]):
+        return None
+    return f"{' '.join(parts[2:-3]).title()}, {parts[1].upper()}"
+
+def _row_details(cells: List[str], url: str) -> CityInfo:
+    """Pull a stop count and date range out of a catalog table row's cell texts."""
+    stops = "Available"
+    dates = []
+    for text in cells:
+        if text.replace(',', '').isdigit():
+            stops = int(text.replace(',', ''))
+        elif ' to ' in text:
+            dates = [text]
+        elif text[:4].isdigit() and text[4:5] == '-':
+            dates.append(text)
+    return CityInfo(stops, " to ".join(dates[:2]) or "TBD", url)
+
+# Bump when the shape of the cached catalog changes; older cache files are then ignored
+CATALOG_CACHE_VERSION = 2
+
+def _read_catalog_cache() -> Optional[Dict]:
+    """The catalog last saved to CATALOG_CACHE_PATH, or None if missing, unreadable or outdated."""
+    try:
+        with open(CATALOG_CACHE_PATH) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("version") != CATALOG_CACHE_VERSION or cached.get("source_url") != STANFORD_DATA_URL:
+        return None
+    # CityInfo entries are saved as JSON arrays
+    cached["locations"] = {name: CityInfo(*fields) for name, fields in cached["locations"].items()}
+    return cached
+
+def _write_catalog_cache(catalog: Dict) -> None:
+    """Save a freshly scraped catalog to disk. Best-effort: a failed write is ignored."""
+    try:
+        os.makedirs(os.path.dirname(CATALOG_CACHE_PATH) or ".", exist_ok=True)
+        # Write to a temp name and rename, so a crash never leaves a half-written file
+        with open(f"{CATALOG_CACHE_PATH}.tmp", "w") as f:
+            json.dump(catalog, f)
+        os.replace(f"{CATALOG_CACHE_PATH}.tmp", CATALOG_CACHE_PATH)
+    except (OSError, TypeError, ValueError):
+        pass
+
+def load_stanford_catalog() -> Dict:
+    """Stanford catalog locations, from the disk cache when fresh, otherwise scraped.
+    
+    Runs on the background catalog thread (see start_catalog_load), whose finished future
+    is the in-process copy shared by every session. The last good scrape is also kept on
+    disk, so a restarted server starts from it instead of refetching; if a refresh fails,
+    the stale copy is served (with the error noted) rather than an empty catalog.
+    """
+    cached = _read_catalog_cache()
+    if cached and time.time() - cached["fetched_at"] < CACHE_EXPIRY:
+        return cached
+    
+    catalog = _scrape_stanford_catalog()
+    if "error" not in catalog:
+        _write_catalog_cache(catalog)
+    elif cached:
+        return dict(cached, error=catalog["error"])
+    return catalog
+
+def _scrape_stanford_catalog() -> Dict:
+    """Scrape the Stanford data page for downloadable locations.
+    
+    Failures come back as an empty catalog with an "error" message rather than raising.
+    """
+    # Imported here: only a catalog refresh needs them, not every script start
+    import requests
+    import bs4
+    from bs4 import BeautifulSoup
+    
+    catalog = {
+        "version": CATALOG_CACHE_VERSION,
+        "source_url": STANFORD_DATA_URL,
+        "fetched_at": time.time(),
+        "dependencies": {"requests": requests.__version__, "beautifulsoup4": bs4.__version__},
+        "locations": {},
+    }
+    try:
+        response = requests.get(STANFORD_DATA_URL, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        catalog["error"] = str(e)
+        return catalog
+    
+    soup = BeautifulSoup(response.text, "html.parser")
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if not href.endswith(".csv.zip"):
+            continue
+        name = _location_from_filename(href)
+        if name is None or name in catalog["locations"]:
+            continue
+        row = link.find_parent("tr")
+        cells = [td.get_text(" ", strip=True) for td in row.find_all("td")] if row else []
+        catalog["locations"][name] = _row_details(cells, href)
+    
+    # Drop scraped entries whose download link is dead
+    reachable = validate_dataset_urls(tuple(info.url for info in catalog["locations"].values()))
+    catalog["locations"] = {name: info for name, info in catalog["locations"].items()
+                            if reachable.get(info.url, True)}
+    return catalog
+
+def validate_dataset_urls(urls: tuple) -> Dict[str, bool]:
+    """HEAD every dataset URL concurrently over one pooled session: url -> reachable.
+    
+    Only called while scraping, so the links are re-checked once per catalog refresh.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    if not urls:
+        return {}
+    
+    workers = min(16, len(urls))
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        
+        def check(url: str) -> bool:
+            try:
+                response = session.head(url, timeout=5, allow_redirects=True)
+            except requests.RequestException:
+                return False
+            # Some hosts refuse HEAD outright; that still means the file server is there
+            return response.status_code < 400 or response.status_code == 405
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(urls, executor.map(check, urls)))
+
+# The catalog load runs here rather than in the script thread, so the page renders while
+# it's in flight. One load is shared by every session, and the script thread only ever
+# reads its finished result.
+_catalog_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stanford-catalog")
+_catalog_lock = threading.Lock()
+_catalog_future: Optional[Future] = None
+_catalog_refresh: Optional[Future] = None  # replaces _catalog_future once it finishes
+_catalog_started_at = 0.0
+
+# Minimum gap between loads, so a failing scrape (served from the stale copy) isn't retried
+# on every rerun
+CATALOG_RETRY_INTERVAL = 60
+
+def _catalog_expired(future: Future) -> bool:
+    """Whether a finished load should be replaced: its catalog was scraped more than
+    CACHE_EXPIRY ago (or it failed), and the last load started long enough ago to retry."""
+    now = time.time()
+    if now - _catalog_started_at < CATALOG_RETRY_INTERVAL:
+        return False
+    if future.exception() is not None:
+        return True
+    return now - future.result()["fetched_at"] >= CACHE_EXPIRY
+
+def start_catalog_load() -> Future:
+    """Start loading the catalog in the background (if not already started) and return the future.
+    
+    A finished load is started again once the catalog it holds is older than CACHE_EXPIRY,
+    counted from when it was scraped; until the new load lands, the old one is returned.
+    """
+    global _catalog_future, _catalog_refresh, _catalog_started_at
+    with _catalog_lock:
+        if _catalog_future is None:
+            _catalog_future = _catalog_pool.submit(load_stanford_catalog)
+            _catalog_started_at = time.time()
+            return _catalog_future
+        
+        if _catalog_refresh is not None and _catalog_refresh.done():
+            _catalog_future, _catalog_refresh = _catalog_refresh, None
+        if _catalog_refresh is None and _catalog_future.done() and _catalog_expired(_catalog_future):
+            # Keep serving the finished load until the refresh replaces it
+            _catalog_refresh = _catalog_pool.submit(load_stanford_catalog)
+            _catalog_started_at = time.time()
+        return _catalog_future
+
+def current_catalog() -> Dict:
+    """The finished catalog load's result; only call once start_catalog_load() is done.
+    
+    A load that raised counts as an empty catalog until it is retried.
+    """
+    future = start_catalog_load()
+    if future.exception() is not None:
+        return {"fetched_at": _catalog_started_at, "locations": {}, "error": str(future.exception())}
+    return future.result()
+
+@st.fragment(run_every=1.0)
+def _catalog_loading_placeholder():
+    """Stand-in for the city list while the catalog loads; reruns the app once it's ready."""
+    if start_catalog_load().done():
+        st.rerun()
+    st.info("⏳ Loading the Stanford catalog…")
+
+def get_stanford_locations() -> Dict[str, CityInfo]:
+    """Scraped catalog locations, with the curated STANFORD_LOCATIONS entries taking precedence."""
+    return {**current_catalog()["locations"], **STANFORD_LOCATIONS}
+
+def _format_city_lines(locations: Dict[str, CityInfo]) -> str:
+    """One markdown block listing every location (hard line breaks between entries)."""
+    lines = []
+    for city, info in locations.items():
+        stops_text = f"{info.stops:,}" if isinstance(info.stops, int) else info.stops
+        lines.append(f"• **{city}**: {stops_text} records ({info.time_range})")
+    return "  \n".join(lines)
+
+# Cities listed per page in the location section
+CITY_PAGE_SIZE = 20
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def filter_stanford_cities(search: str, fetched_at: float) -> List[str]:
+    """Catalog city names containing search (case-insensitive), in catalog order.
+    
+    fetched_at is the current catalog's, so each refresh gets its own cache entries.
+    """
+    needle = search.strip().lower()
+    return [city for city in get_stanford_locations() if needle in city.lower()]
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def stanford_city_lines(search: str, page: int, fetched_at: float) -> str:
+    """One page of the filtered city list as markdown, formatted once per catalog refresh
+    rather than per rerun."""
+    locations = get_stanford_locations()
+    cities = filter_stanford_cities(search, fetched_at)[page * CITY_PAGE_SIZE:(page + 1) * CITY_PAGE_SIZE]
+    return _format_city_lines({city: locations[city] for city in cities})
+
+def _session_city_lines(search: str, page: int, fetched_at: float) -> str:
+    """stanford_city_lines, kept in the session for as long as the filter, page and catalog
+    stay the same, so a plain rerun skips the cache_data hash-and-copy round trip."""
+    key = (search, page, fetched_at)
+    stashed = st.session_state.get("_city_md")
+    if stashed is None or stashed[0] != key:
+        stashed = (key, stanford_city_lines(search, page, fetched_at))
+        st.session_state["_city_md"] = stashed
+    return stashed[1]
+
+def _set_city_page(page: int) -> None:
+    st.session_state.city_page = page
+
+def _checkbox_grid(label: str, options: List[str], key_prefix: str,
+                   help: Optional[str] = None, columns: int = 3) -> List[str]:
+    """Checkboxes in a grid, in place of st.multiselect for short fixed option lists.
+    Returns the checked options in their listed order."""
+    st.markdown(label, help=help)
+    cols = st.columns(columns)
+    return [option for i, option in enumerate(options)
+            if cols[i % columns].checkbox(option, key=f"{key_prefix}_{i}")]
+
+# Radio labels -> stored answers for the fixed-choice sections; built once at import
+# rather than on every rerun. Size entries are read-only since every session shares them.
+_SOURCE_MAPPING = {
+    "Stanford Open Policing Project (traffic stops, searches, outcomes)": "stanford",
+    "Police Data Initiative (arrests, crimes, use of force)": "pdi",
+    "Both sources (I'll search all available data)": "both"
+}
+
+_SIZE_MAPPING = {
+    "Sample data (1,000-5,000 records) - for quick analysis and testing": MappingProxyType({"type": "sample", "max_records": 5000}),
+    "Medium dataset (10,000-50,000 records) - for standard analysis": MappingProxyType({"type": "medium", "max_records": 50000}),
+    "Large dataset (100,000+ records) - for comprehensive research": MappingProxyType({"type": "large", "max_records": None}),
+    "All available data - regardless of size": MappingProxyType({"type": "all", "max_records": None})
+}
+
+# Sections of the requirements form, in order; each renderer stores its answer under
+# st.session_state[f"req_{key}"]
+REQUIREMENT_KEYS = (
+    "data_source", "location", "data_types", "time_period",
+    "data_size", "analysis_purpose", "metrics", "output"
+)
 
 class UserDataRequirements:
     def __init__(self):
         self.stanford_url = "https://openpolicing.stanford.edu/data/"
         self.pdi_url = "https://www.policedatainitiative.org/datasets/"
-        
-        # Known available locations from Stanford (from the actual data table)
-        self.stanford_locations = {
-            "Seattle, WA": {
-                "stops": 319959,
-                "time_range": "2006-01-01 to 2015-12-31",
-                "url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_wa_seattle_2020_04_01.csv.zip"
-            },
-            "Chicago, IL": {
-                "stops": "Available",
-                "time_range": "TBD",
-                "url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_il_chicago_2020_04_01.csv.zip"
-            },
-            "New York, NY": {
-                "stops": "Available", 
-                "time_range": "TBD",
-                "url": "https://stacks.stanford.edu/file/druid:rk9745n3214/rk9745n3214_ny_new_york_2020_04_01.csv.zip"
-            },
-            "Los Angeles, CA": {
-                "stops": "Available",
-                "time_range": "TBD", 
-                "url": "https://stacks.stanford.edu/file/druid:yg821jf8611/yg821jf8611_ca_los_angeles_2020_04_01.csv.zip"
-            }
-        }
+        self.stanford_locations = STANFORD_LOCATIONS
 
+@st.fragment
 def render_data_source_selection():
     """Ask user which data source they prefer."""
     st.markdown("## 📊 Data Source Selection")
@@ -48,25 +344,16 @@ def render_data_source_selection():
     
     source_choice = st.radio(
         "**Which data source would you prefer?**",
-        [
-            "Stanford Open Policing Project (traffic stops, searches, outcomes)",
-            "Police Data Initiative (arrests, crimes, use of force)", 
-            "Both sources (I'll search all available data)"
-        ],
+        list(_SOURCE_MAPPING),
         help="Stanford focuses on traffic stops while PDI has broader police activities"
     )
     
-    source_mapping = {
-        "Stanford Open Policing Project (traffic stops, searches, outcomes)": "stanford",
-        "Police Data Initiative (arrests, crimes, use of force)": "pdi",
-        "Both sources (I'll search all available data)": "both"
-    }
-    
-    return source_mapping[source_choice]
+    st.session_state["req_data_source"] = _SOURCE_MAPPING[source_choice]
 
+@st.fragment
 def render_location_selection():
     """Ask user for specific location requirements."""
-    st.markdown("## 📍 Location Requirements")
+    st.markdown("---\n\n## 📍 Location Requirements")
     
     location_type = st.radio(
         "**How would you like to specify the location?**",
@@ -80,27 +367,62 @@ def render_location_selection():
     if location_type == "Select from available cities":
         st.markdown("**Available cities with confirmed data:**")
         
-        # Show Stanford locations
+        # Show Stanford locations, filtered and a page at a time
         st.markdown("### Stanford Open Policing Project:")
-        for city, info in UserDataRequirements().stanford_locations.items():
-            stops_text = f"{info['stops']:,}" if isinstance(info['stops'], int) else info['stops']
-            st.write(f"• **{city}**: {stops_text} records ({info['time_range']})")
+        search = st.text_input("Filter cities", key="city_filter", on_change=_set_city_page, args=(0,))
+        catalog_ready = start_catalog_load().done()
+        if catalog_ready:
+            fetched_at = current_catalog()["fetched_at"]
+            cities = filter_stanford_cities(search, fetched_at)
+        else:
+            _catalog_loading_placeholder()
+            cities = []
+        pages = max(1, -(-len(cities) // CITY_PAGE_SIZE))
+        page = min(st.session_state.get("city_page", 0), pages - 1)
         
-        selected_city = st.selectbox(
-            "Choose a city:",
-            list(UserDataRequirements().stanford_locations.keys())
-        )
+        if cities:
+            st.markdown(_session_city_lines(search, page, fetched_at))
+            if pages > 1:
+                prev_col, page_col, next_col = st.columns([1, 4, 1])
+                prev_col.button("◀", key="city_prev", disabled=page == 0,
+                                on_click=_set_city_page, args=(page - 1,))
+                page_col.caption(f"Page {page + 1} of {pages} ({len(cities)} cities)")
+                next_col.button("▶", key="city_next", disabled=page == pages - 1,
+                                on_click=_set_city_page, args=(page + 1,))
+            
+            selected_city = st.selectbox(
+                "Choose a city:",
+                cities[page * CITY_PAGE_SIZE:(page + 1) * CITY_PAGE_SIZE]
+            )
+        else:
+            if catalog_ready:
+                st.info("No cities match that filter.")
+            selected_city = None
         
-        return {"type": "city", "value": selected_city}
+        location = {"type": "city", "value": selected_city}
     
     elif location_type == "Enter specific department name":
-        department_name = st.text_input(
+        query = st.text_input(
             "**Enter the exact police department name:**",
             placeholder="e.g., Seattle Police Department, NYPD, Chicago Police Department",
             help="Be as specific as possible for better search results"
         )
         
-        return {"type": "department", "value": department_name}
+        # Only the filtered, capped matches go to the selectbox; text that matches no
+        # known department is used as typed
+        typed = query.strip()
+        matches = _matching_departments(typed) if typed else []
+        if matches:
+            options = matches if typed in matches else matches + [typed]
+            department_name = st.selectbox(
+                "**Matching departments:**",
+                options,
+                help=f"Up to {MAX_DEPARTMENT_RESULTS} matches; the last option keeps your text as typed"
+            )
+        else:
+            department_name = query
+        
+        location = {"type": "department", "value": department_name}
     
     else:  # Search by state/region
         state_region = st.selectbox(
@@ -116,13 +438,16 @@ def render_location_selection():
         if state_region == "Other (specify below)":
             state_region = st.text_input("Specify state/region:")
         
-        return {"type": "state", "value": state_region}
+        location = {"type": "state", "value": state_region}
+    
+    st.session_state["req_location"] = location
 
+@st.fragment
 def render_data_type_selection():
     """Ask user what type of police data they need."""
-    st.markdown("## 📋 Data Type Requirements")
+    st.markdown("---\n\n## 📋 Data Type Requirements")
     
-    data_types = st.multiselect(
+    data_types = _checkbox_grid(
         "**What type of police data do you need?** (Select all that apply)",
         [
             "Traffic stops and vehicle searches",
@@ -133,18 +458,19 @@ def render_data_type_selection():
             "Community policing activities",
             "Any available police data"
         ],
+        key_prefix="data_type",
         help="Different sources specialize in different types of data"
     )
     
     if not data_types:
         st.warning("Please select at least one data type.")
-        return []
     
-    return data_types
+    st.session_state["req_data_types"] = data_types
 
+@st.fragment
 def render_time_period_selection():
     """Ask user about time period requirements."""
-    st.markdown("## 📅 Time Period Requirements")
+    st.markdown("---\n\n## 📅 Time Period Requirements")
     
     time_preference = st.radio(
         "**What time period are you interested in?**",
@@ -160,45 +486,32 @@ def render_time_period_selection():
     time_details["preference"] = time_preference
     
     if time_preference == "Specific year range":
-        col1, col2 = st.columns(2)
-        with col1:
-            start_year = st.number_input("Start year:", min_value=2000, max_value=2024, value=2020)
-        with col2:
-            end_year = st.number_input("End year:", min_value=2000, max_value=2024, value=2024)
+        start_year = st.number_input("Start year:", min_value=2000, max_value=2024, value=2020)
+        end_year = st.number_input("End year:", min_value=2000, max_value=2024, value=2024)
         
         time_details["start_year"] = start_year
         time_details["end_year"] = end_year
     
-    return time_details
+    st.session_state["req_time_period"] = time_details
 
+@st.fragment
 def render_data_size_selection():
     """Ask user about data size requirements."""
-    st.markdown("## 📊 Data Volume Requirements")
+    st.markdown("---\n\n## 📊 Data Volume Requirements")
     
     size_preference = st.radio(
         "**How much data do you need?**",
-        [
-            "Sample data (1,000-5,000 records) - for quick analysis and testing",
-            "Medium dataset (10,000-50,000 records) - for standard analysis",
-            "Large dataset (100,000+ records) - for comprehensive research",
-            "All available data - regardless of size"
-        ]
+        list(_SIZE_MAPPING)
     )
     
-    size_mapping = {
-        "Sample data (1,000-5,000 records) - for quick analysis and testing": {"type": "sample", "max_records": 5000},
-        "Medium dataset (10,000-50,000 records) - for standard analysis": {"type": "medium", "max_records": 50000},
-        "Large dataset (100,000+ records) - for comprehensive research": {"type": "large", "max_records": None},
-        "All available data - regardless of size": {"type": "all", "max_records": None}
-    }
-    
-    return size_mapping[size_preference]
+    st.session_state["req_data_size"] = _SIZE_MAPPING[size_preference]
 
+@st.fragment
 def render_analysis_purpose_selection():
     """Ask user about their analysis purpose."""
-    st.markdown("## 🎯 Analysis Purpose")
+    st.markdown("---\n\n## 🎯 Analysis Purpose")
     
-    purposes = st.multiselect(
+    purposes = _checkbox_grid(
         "**What is the purpose of your analysis?** (Select all that apply)",
         [
             "Academic research",
@@ -209,20 +522,22 @@ def render_analysis_purpose_selection():
             "Personal education",
             "Data science project",
             "Other"
-        ]
+        ],
+        key_prefix="purpose"
     )
     
-    if "Other" in purposes:
-        other_purpose = st.text_input("Please specify:")
-        purposes.append(f"Other: {other_purpose}")
+    # Kept apart from the checked purposes; the two are combined only on submit
+    other_purpose = st.text_input("Please specify:") if "Other" in purposes else ""
     
-    return purposes
+    st.session_state["req_analysis_purpose"] = purposes
+    st.session_state["req_other_purpose"] = other_purpose
 
+@st.fragment
 def render_specific_metrics_selection():
     """Ask user about specific metrics they're interested in."""
-    st.markdown("## 📈 Specific Metrics of Interest")
+    st.markdown("---\n\n## 📈 Specific Metrics of Interest")
     
-    metrics = st.multiselect(
+    metrics = _checkbox_grid(
         "**Which specific metrics are you most interested in?** (Select all that apply)",
         [
             "Search rates by demographic groups",
@@ -236,30 +551,29 @@ def render_specific_metrics_selection():
             "Geographic distribution of incidents",
             "Temporal trends and patterns",
             "All available metrics"
-        ]
+        ],
+        key_prefix="metric"
     )
     
-    return metrics
+    st.session_state["req_metrics"] = metrics
 
+@st.fragment
 def render_output_format_selection():
     """Ask user about preferred output format."""
-    st.markdown("## 💾 Output Format Preferences")
-    
-    col1, col2 = st.columns(2)
+    st.markdown("---\n\n## 💾 Output Format Preferences")
     
-    with col1:
-        file_format = st.selectbox(
-            "**Preferred file format:**",
-            ["CSV", "Excel", "JSON", "Parquet", "SQLite Database"]
-        )
+    # Flat button groups; a segment can be clicked off again, so fall back to the first option
+    file_formats = ["CSV", "Excel", "JSON", "Parquet", "SQLite Database"]
+    file_format = st.segmented_control(
+        "**Preferred file format:**", file_formats, default=file_formats[0]
+    ) or file_formats[0]
     
-    with col2:
-        visualization = st.selectbox(
-            "**Visualization preference:**",
-            ["Interactive dashboard", "Static reports", "Raw data only", "Both dashboard and raw data"]
-        )
+    visualizations = ["Interactive dashboard", "Static reports", "Raw data only", "Both dashboard and raw data"]
+    visualization = st.segmented_control(
+        "**Visualization preference:**", visualizations, default=visualizations[0]
+    ) or visualizations[0]
     
-    return {"file_format": file_format, "visualization": visualization}
+    st.session_state["req_output"] = {"file_format": file_format, "visualization": visualization}
 
 def collect_user_requirements():
     """Main function to collect all user requirements."""
@@ -271,54 +585,53 @@ def collect_user_requirements():
     🏛️ **Police Data Initiative**: https://www.policedatainitiative.org/datasets/
     """)
     
-    # Collect all requirements
-    requirements = {}
+    # Get the catalog scrape going while the rest of the form renders
+    start_catalog_load()
     
-    # Data source
-    requirements["data_source"] = render_data_source_selection()
+    # Each section is a fragment: changing one of its widgets reruns only that section,
+    # and the section keeps its latest answer in st.session_state["req_<key>"]
     
-    st.divider()
+    # Data source
+    render_data_source_selection()
     
     # Location
-    requirements["location"] = render_location_selection()
-    
-    st.divider()
+    render_location_selection()
     
     # Data type
-    requirements["data_types"] = render_data_type_selection()
-    
-    st.divider()
+    render_data_type_selection()
     
     # Time period
-    requirements["time_period"] = render_time_period_selection()
-    
-    st.divider()
+    render_time_period_selection()
     
     # Data size
-    requirements["data_size"] = render_data_size_selection()
-    
-    st.divider()
+    render_data_size_selection()
     
     # Analysis purpose
-    requirements["analysis_purpose"] = render_analysis_purpose_selection()
-    
-    st.divider()
+    render_analysis_purpose_selection()
     
     # Specific metrics
-    requirements["metrics"] = render_specific_metrics_selection()
-    
-    st.divider()
+    render_specific_metrics_selection()
     
     # Output format
-    requirements["output"] = render_output_format_selection()
+    render_output_format_selection()
     
     # Summary and confirmation
-    st.divider()
-    st.markdown("## 📋 Requirements Summary")
+    st.markdown("---\n\n## 📋 Requirements Summary")
     
     if st.button("🔍 **Search for Data Based on Requirements**", type="primary"):
-        st.markdown("### Your Requirements:")
-        st.json(requirements)
+        requirements = {key: st.session_state.get(f"req_{key}") for key in REQUIREMENT_KEYS}
+        if requirements["data_size"] is not None:
+            # Hand callers their own copy of the shared read-only size entry
+            requirements["data_size"] = dict(requirements["data_size"])
+        other_purpose = st.session_state.get("req_other_purpose", "")
+        if requirements["analysis_purpose"] is not None:
+            # "Other" with nothing typed stays as plain "Other"
+            requirements["analysis_purpose"] = [
+                f"Other: {other_purpose}" if purpose == "Other" and other_purpose else purpose
+                for purpose in requirements["analysis_purpose"]
+            ]
+        with st.expander("**Your Requirements**", expanded=False):
+            st.code(json.dumps(requirements, indent=2), language="json")
         
         st.success("✅ Requirements collected! Searching for matching datasets...")
         